@@ -13,33 +13,205 @@ Module: from gpio_skill import activate, deactivate, toggle, read, set_level,
                                rename
 """
 
+import atexit
+import copy
+import functools
+import importlib
+import importlib.util
+import io
 import json
+import mmap
+import operator
+import queue
 import sys
 import subprocess
 import shutil
 import argparse
 import os
 import re
+import select
+import threading
 import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager, redirect_stdout
 from pathlib import Path
 
+try:
+    import lgpio
+except (ImportError, OSError):
+    lgpio = None
+
+try:
+    import serial
+except ImportError:
+    serial = None
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+def _json_loads(raw: bytes | str):
+    return orjson.loads(raw) if orjson is not None else json.loads(raw)
+
+
+def _json_dumps(obj) -> str:
+    """Compact JSON for CLI output."""
+    if orjson is not None:
+        return orjson.dumps(obj, option=orjson.OPT_NON_STR_KEYS).decode()
+    return json.dumps(obj)
+
+
+def _config_dumps(config: dict) -> bytes:
+    if orjson is not None:
+        return orjson.dumps(config, option=orjson.OPT_INDENT_2)
+    return json.dumps(config, indent=2, ensure_ascii=False).encode()
+
+
 CONFIG_FILE = Path(__file__).parent / "pin_config.json"
 
+SYSFS_GPIO = Path("/sys/class/gpio")
+
+# Device types accepted in pin_config.json, and the ones read_all reports
+_DEVICE_TYPES = ("output", "relay", "input", "sensor", "pwm", "servo")
+_DEVICE_TYPE_SET = frozenset(_DEVICE_TYPES)
+_INPUT_TYPES = frozenset(("input", "sensor"))
+_BAD_TYPE_ERROR = {"success": False, "error": f"type must be one of: {', '.join(_DEVICE_TYPES)}"}
+# Per-device options register accepts besides name, pin, type and description
+_DEVICE_OPTIONS = frozenset(("active_low", "pull_up", "frequency"))
+
+# gpiochip holding the 40-pin header. 0 on current Raspberry Pi OS kernels;
+# Pi 5 images older than kernel 6.6.45 expose it as gpiochip4.
+GPIOCHIP = int(os.environ.get("GPIO_SKILL_GPIOCHIP", "0"))
+
+# gpiozero (last-resort backend) reads this when it is first imported
+os.environ.setdefault("GPIOZERO_PIN_FACTORY", "lgpio")
+# Whether gpiozero is installed, without paying for importing it on every CLI run
+_HAS_GPIOZERO = importlib.util.find_spec("gpiozero") is not None
+
 
 # ---------------------------------------------------------------------------
 # Config
 # ---------------------------------------------------------------------------
 
-def load_config() -> dict:
-    if not CONFIG_FILE.exists():
+_CONFIG_CACHE: dict | None = None   # last parsed pin_config.json
+_CONFIG_STAMP: tuple | None = None  # _config_stamp() of the file _CONFIG_CACHE came from
+_DEFER_DEPTH = 0          # > 0 inside _defer_save(): saves only update the cache
+_SAVE_PENDING = False     # a deferred save is waiting to be written
+
+
+def _config_stamp(st: os.stat_result) -> tuple:
+    # Size as well as mtime: edits within one coarse mtime tick usually change the length.
+    # The inode catches the rest when the file is replaced (our saves, most editors).
+    return st.st_mtime_ns, st.st_size, st.st_ino, st.st_dev
+
+
+def _shared_config() -> dict:
+    """
+    Return the parsed pin_config.json, re-reading it only when the file changes.
+    The dict is shared by every internal caller — never modify it.
+    """
+    global _CONFIG_CACHE, _CONFIG_STAMP
+    if _SAVE_PENDING:
+        # Inside _defer_save() the cache is newer than the file (or the file is missing)
+        return _CONFIG_CACHE
+    try:
+        stamp = _config_stamp(CONFIG_FILE.stat())
+    except FileNotFoundError:
         return {"devices": {}}
-    with open(CONFIG_FILE) as f:
-        return json.load(f)
+    if _CONFIG_CACHE is None or stamp != _CONFIG_STAMP:
+        _CONFIG_CACHE = _json_loads(CONFIG_FILE.read_bytes())
+        _CONFIG_STAMP = stamp
+    return _CONFIG_CACHE
+
+
+def load_config() -> dict:
+    """
+    Return a private copy of pin_config.json, free to modify — what external
+    callers and the functions that edit and save the config use.
+    """
+    return copy.deepcopy(_shared_config())
+
+
+def clear_load_cache() -> None:
+    """Forget the cached config so the next load re-reads the file."""
+    global _CONFIG_CACHE, _CONFIG_STAMP
+    _CONFIG_CACHE, _CONFIG_STAMP = None, None
+
+
+def _write_config(config: dict) -> None:
+    """Write config to a temp file and swap it in, so a crash never leaves a half-written file."""
+    global _CONFIG_CACHE, _CONFIG_STAMP
+    tmp = CONFIG_FILE.with_suffix(".json.tmp")
+    try:
+        with open(tmp, "wb") as f:
+            f.write(_config_dumps(config))
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, CONFIG_FILE)
+    except BaseException:
+        tmp.unlink(missing_ok=True)
+        raise
+    # fsync the directory too, or the rename itself can be lost on power cut
+    fd = os.open(CONFIG_FILE.parent, os.O_RDONLY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+    _CONFIG_CACHE, _CONFIG_STAMP = config, _config_stamp(CONFIG_FILE.stat())
 
 
 def _save_config(config: dict) -> None:
-    with open(CONFIG_FILE, "w") as f:
-        json.dump(config, f, indent=2)
+    global _CONFIG_CACHE, _SAVE_PENDING
+    if _DEFER_DEPTH:
+        _CONFIG_CACHE, _SAVE_PENDING = config, True
+        return
+    _write_config(config)
+
+
+@contextmanager
+def _defer_save():
+    """Batch every _save_config() in the block into one write at the end."""
+    global _DEFER_DEPTH, _SAVE_PENDING
+    _DEFER_DEPTH += 1
+    try:
+        yield
+    finally:
+        _DEFER_DEPTH -= 1
+        if not _DEFER_DEPTH and _SAVE_PENDING:
+            _SAVE_PENDING = False
+            _write_config(_CONFIG_CACHE)
+
+
+_PIN_INDEX: tuple | None = None   # (devices dict, {pin: (name, device)}, input rows)
+
+
+def _reindex(devices: dict) -> dict[int, tuple[str, dict]]:
+    """Rebuild the pin index for devices; call after changing a devices dict in place."""
+    global _PIN_INDEX
+    index: dict[int, tuple[str, dict]] = {}
+    inputs: list[tuple[str, int, bool, str]] = []
+    for name, d in devices.items():
+        index.setdefault(d["pin"], (name, d))
+        if d.get("type") in _INPUT_TYPES:
+            inputs.append((name, d["pin"], d.get("pull_up", False), d.get("description", "")))
+    _PIN_INDEX = (devices, index, tuple(inputs))
+    return index
+
+
+def _pin_index(devices: dict) -> dict[int, tuple[str, dict]]:
+    """pin -> (name, device) for devices, built once per devices dict."""
+    if _PIN_INDEX is not None and _PIN_INDEX[0] is devices:
+        return _PIN_INDEX[1]
+    return _reindex(devices)
+
+
+def _input_rows(devices: dict) -> tuple[tuple[str, int, bool, str], ...]:
+    """(name, pin, pull_up, description) of every input/sensor device, built with the pin index."""
+    if _PIN_INDEX is None or _PIN_INDEX[0] is not devices:
+        _reindex(devices)
+    return _PIN_INDEX[2]
 
 
 def _resolve(identifier: str | int, config: dict) -> tuple[int, dict]:
@@ -50,183 +222,1110 @@ def _resolve(identifier: str | int, config: dict) -> tuple[int, dict]:
     """
     devices = config.get("devices", {})
 
-    # 1. Try by registered name
-    if str(identifier) in devices:
-        d = devices[str(identifier)]
-        return d["pin"], d
+    if isinstance(identifier, int):
+        # JSON "pin": 17 — a pin number, so skip the name lookup
+        pin = identifier
+    else:
+        # 1. Try by registered name
+        name = identifier if isinstance(identifier, str) else str(identifier)
+        d = devices.get(name)
+        if d is not None:
+            return d["pin"], d
 
-    # 2. Try to parse as a pin number
-    try:
-        pin = int(identifier)
-    except (ValueError, TypeError):
-        raise ValueError(
-            f"'{identifier}' is not a registered name and not a pin number. "
-            "Use list_devices to see registered names."
-        )
+        # 2. Try to parse as a pin number
+        try:
+            pin = int(identifier)
+        except (ValueError, TypeError):
+            raise ValueError(
+                f"'{identifier}' is not a registered name and not a pin number. "
+                "Use list_devices to see registered names."
+            )
 
     # 3. Pin number given — check if it has a registered name
-    for d in devices.values():
-        if d["pin"] == pin:
-            return pin, d
+    hit = _pin_index(devices).get(pin)
+    if hit:
+        return pin, hit[1]
 
-    # 4. Unregistered pin — return a default output device
-    return pin, {"pin": pin, "type": "output", "description": f"Pin {pin} (not registered)"}
+    # 4. Unregistered pin — return a default output device (no description)
+    return pin, {"pin": pin, "type": "output"}
 
 
 # ---------------------------------------------------------------------------
 # Low-level GPIO
 # ---------------------------------------------------------------------------
 
+@functools.lru_cache(maxsize=None)
+def _optional_module(name: str):
+    """
+    Import a heavy optional library (gpiozero, adafruit_dht, board, RPLCD.*)
+    the first time it is needed and remember the result; None if not installed.
+    """
+    try:
+        return importlib.import_module(name)
+    except ImportError:
+        return None
+
+
+_CHIP: int | None = None                 # lgpio handle, opened on first use (-1 = unavailable)
+_CLAIMED: dict[int, tuple[str, int]] = {}  # pin -> (direction, line flags) claimed on _CHIP
+_GROUPS: dict[int, tuple[int, ...]] = {}   # group leader -> pins claimed together for batch reads
+_PIN_FD_CACHE: dict[int, io.FileIO] = {}  # pin -> open sysfs value file, for polling without lgpio
+_SYSFS_EXPORTED: list[int] = []           # sysfs GPIO numbers this process exported
+_GPIO_LOCK = threading.RLock()            # guards the chip handle and claim tables (parallel steps)
+_PIN_STATE: dict[int, bool] = {}          # pin -> level this process last set through pinctrl
+                                          # (dropped whenever anything else drives the pin)
+_GPIOMEM: memoryview | None = None        # /dev/gpiomem(0) registers as uint32 words, opened on first use
+_GPIOMEM_SOC = ""                         # "bcm2835", "bcm2711" or "rp1" once mapped, "-" = unavailable
+_ONE_SHOT = False                         # set by main(): output levels must outlive this process
+
+
+@functools.lru_cache(maxsize=1)
+def _pinctrl_path() -> str | None:
+    """Full path of the pinctrl binary, looked up on $PATH once per process."""
+    return shutil.which("pinctrl")
+
+
 def _pinctrl_available() -> bool:
-    return shutil.which("pinctrl") is not None
+    return _pinctrl_path() is not None
 
 
-def _write_pin(pin: int, value: bool) -> dict:
-    if _pinctrl_available():
-        level = "dh" if value else "dl"
+def _pinctrl_set(*args: str) -> str | None:
+    """
+    Run `pinctrl set ARGS...` and return its error text, or None on success.
+    Spawned with os.posix_spawn (vfork + exec) and stdout sent to /dev/null,
+    which is cheaper than a subprocess.Popen for a call that prints nothing.
+    """
+    path = _pinctrl_path()
+    r, w = os.pipe()
+    try:
+        pid = os.posix_spawn(path, [path, "set", *args], os.environ, file_actions=[
+            (os.POSIX_SPAWN_OPEN, 1, os.devnull, os.O_WRONLY, 0),
+            (os.POSIX_SPAWN_DUP2, w, 2),
+        ])
+    except OSError as e:
+        os.close(r)
+        return str(e)
+    finally:
+        os.close(w)
+    with open(r, "rb") as f:
+        err = f.read()
+    code = os.waitstatus_to_exitcode(os.waitpid(pid, 0)[1])
+    if code == 0:
+        return None
+    return err.decode(errors="replace").strip() or f"pinctrl exited with status {code}"
+
+
+def _get_chip() -> int | None:
+    """Return the process-wide lgpio chip handle, or None if lgpio can't be used."""
+    global _CHIP
+    if _CHIP is None:
+        with _GPIO_LOCK:
+            if _CHIP is None:
+                chip = -1
+                if lgpio is not None:
+                    try:
+                        chip = lgpio.gpiochip_open(GPIOCHIP)
+                        atexit.register(lgpio.gpiochip_close, chip)
+                    except lgpio.error:
+                        pass
+                _CHIP = chip
+    return _CHIP if _CHIP >= 0 else None
+
+
+def _lgpio_writes(pin: int) -> bool:
+    """
+    Whether writes to pin go through lgpio. The kernel may return a line to
+    input once the process that claimed it exits, so a CLI run drives pins
+    through gpiomem or pinctrl, which leave the level latched, and keeps
+    lgpio for reads — or for writes when neither of those can reach the pin.
+    """
+    if _get_chip() is None:
+        return False
+    if not _ONE_SHOT:
+        return True
+    return not ((_get_gpiomem() is not None and pin < _GPIOMEM_PINS) or _pinctrl_available())
+
+
+def _unclaim(pin: int) -> None:
+    """Drop an lgpio claim on pin before another backend drives it."""
+    if pin in _CLAIMED:
+        _release(pin)
+
+
+# BCM2835/6/7 (Pi 1–3, Zero) and BCM2711 (Pi 4, 400, CM4) GPIO register
+# offsets in /dev/gpiomem, in 32-bit words.
+_GPFSEL0 = 0x00 // 4      # 3 function bits per pin, 10 pins per word
+_GPSET0 = 0x1C // 4
+_GPCLR0 = 0x28 // 4
+_GPLEV0 = 0x34 // 4
+_GPPUD = 0x94 // 4        # BCM2835 pull control ...
+_GPPUDCLK0 = 0x98 // 4    # ... latched into each pin by its clock bit
+_GPPUPPDN0 = 0xE4 // 4    # BCM2711: 2 pull bits per pin, 16 pins per word
+_FSEL_INPUT, _FSEL_OUTPUT = 0, 1
+
+# The Pi 5's RP1 bank 0 (the header pins) in /dev/gpiomem0, in 32-bit words:
+# IO_BANK0 holds a CTRL word per pin, SYS_RIO the output/enable/input bits
+# (with atomic set and clear aliases) and PADS_BANK0 a pad word per pin.
+_RP1_CTRL0 = 0x00004 // 4      # GPIOn_CTRL = _RP1_CTRL0 + 2 * n
+_RP1_RIO_OUT = 0x10000 // 4
+_RP1_RIO_OE = 0x10004 // 4
+_RP1_RIO_IN = 0x10008 // 4
+_RP1_RIO_SET = 0x2000 // 4     # add to a RIO word for its set alias ...
+_RP1_RIO_CLR = 0x3000 // 4     # ... or its clear alias
+_RP1_PADS0 = 0x20004 // 4      # GPIOn pad = _RP1_PADS0 + n
+_RP1_FUNCSEL_RIO = 5
+_RP1_PAD_OD, _RP1_PAD_IE, _RP1_PAD_PUE, _RP1_PAD_PDE = 1 << 7, 1 << 6, 1 << 3, 1 << 2
+
+# soc -> (device node, bytes to map, pins it covers)
+_GPIOMEM_LAYOUT = {"bcm2835": ("/dev/gpiomem", mmap.PAGESIZE, 54),
+                   "bcm2711": ("/dev/gpiomem", mmap.PAGESIZE, 54),
+                   "rp1": ("/dev/gpiomem0", 0x30000, 28)}
+_GPIOMEM_PINS = 0                          # pins the mapping covers, 0 until mapped
+
+
+def _get_gpiomem() -> memoryview | None:
+    """Map the BCM283x/2711 or RP1 GPIO block once per process; None on other boards."""
+    global _GPIOMEM, _GPIOMEM_SOC, _GPIOMEM_PINS
+    if _GPIOMEM is not None or _GPIOMEM_SOC == "-":
+        return _GPIOMEM
+    with _GPIO_LOCK:
+        if _GPIOMEM is not None or _GPIOMEM_SOC == "-":
+            return _GPIOMEM
+        _GPIOMEM_SOC = "-"
         try:
-            subprocess.run(
-                ["pinctrl", "set", str(pin), "op", level],
-                check=True, capture_output=True, text=True,
-            )
-            return {"success": True, "pin": pin, "value": value, "backend": "pinctrl"}
-        except subprocess.CalledProcessError as e:
-            return {"success": False, "error": e.stderr.strip()}
+            compatible = Path("/proc/device-tree/compatible").read_bytes()
+        except OSError:
+            return None
+        if b"brcm,bcm2712" in compatible:
+            soc = "rp1"
+        elif b"brcm,bcm2711" in compatible:
+            soc = "bcm2711"
+        elif any(b"brcm,bcm283" + c in compatible for c in (b"5", b"6", b"7")):
+            soc = "bcm2835"
+        else:
+            return None
+        node, length, pins = _GPIOMEM_LAYOUT[soc]
+        try:
+            fd = os.open(node, os.O_RDWR | os.O_SYNC)
+        except OSError:
+            return None
+        try:
+            mm = mmap.mmap(fd, length, mmap.MAP_SHARED, mmap.PROT_READ | mmap.PROT_WRITE)
+        except OSError:
+            return None
+        finally:
+            os.close(fd)   # the mapping stays valid without the fd
+        _GPIOMEM, _GPIOMEM_SOC, _GPIOMEM_PINS = memoryview(mm).cast("I"), soc, pins
+        return _GPIOMEM
+
+
+def _gpiomem_fsel(regs: memoryview, pin: int) -> int:
+    return regs[_GPFSEL0 + pin // 10] >> (pin % 10 * 3) & 7
+
+
+def _gpiomem_set_fsel(regs: memoryview, pin: int, fsel: int) -> None:
+    word, shift = _GPFSEL0 + pin // 10, pin % 10 * 3
+    with _GPIO_LOCK:
+        regs[word] = regs[word] & ~(7 << shift) & 0xFFFFFFFF | fsel << shift
+
+
+def _rp1_is_rio(regs: memoryview, pin: int) -> bool:
+    return regs[_RP1_CTRL0 + 2 * pin] & 0x1F == _RP1_FUNCSEL_RIO
+
+
+def _rp1_to_rio(regs: memoryview, pin: int) -> None:
+    """Hand pin to SYS_RIO with its pad's input enabled and output not disabled."""
+    pad, ctrl = _RP1_PADS0 + pin, _RP1_CTRL0 + 2 * pin
+    with _GPIO_LOCK:
+        regs[pad] = regs[pad] & ~_RP1_PAD_OD & 0xFFFFFFFF | _RP1_PAD_IE
+        regs[ctrl] = regs[ctrl] & ~0x1F & 0xFFFFFFFF | _RP1_FUNCSEL_RIO
+
+
+def _gpiomem_is_input(regs: memoryview, pin: int) -> bool:
+    if _GPIOMEM_SOC == "rp1":
+        return _rp1_is_rio(regs, pin) and not regs[_RP1_RIO_OE] >> pin & 1
+    return _gpiomem_fsel(regs, pin) == _FSEL_INPUT
+
+
+def _gpiomem_set_input(regs: memoryview, pin: int) -> None:
+    if _GPIOMEM_SOC == "rp1":
+        regs[_RP1_RIO_OE + _RP1_RIO_CLR] = 1 << pin
+        if not _rp1_is_rio(regs, pin):
+            _rp1_to_rio(regs, pin)
+        return
+    _gpiomem_set_fsel(regs, pin, _FSEL_INPUT)
+
+
+def _gpiomem_pull_up(regs: memoryview, pin: int) -> None:
+    if _GPIOMEM_SOC == "rp1":
+        pad = _RP1_PADS0 + pin
+        with _GPIO_LOCK:
+            regs[pad] = regs[pad] & ~_RP1_PAD_PDE & 0xFFFFFFFF | _RP1_PAD_PUE
+        return
+    if _GPIOMEM_SOC == "bcm2711":
+        word, shift = _GPPUPPDN0 + pin // 16, pin % 16 * 2
+        with _GPIO_LOCK:
+            regs[word] = regs[word] & ~(3 << shift) & 0xFFFFFFFF | 1 << shift
+        return
+    # BCM2835: set the control, clock it into the pin, then release both
+    # (the datasheet asks for 150 core cycles between steps)
+    with _GPIO_LOCK:
+        regs[_GPPUD] = 2
+        time.sleep(0.00001)
+        regs[_GPPUDCLK0 + pin // 32] = 1 << pin % 32
+        time.sleep(0.00001)
+        regs[_GPPUD] = 0
+        regs[_GPPUDCLK0 + pin // 32] = 0
+
+
+def _gpiomem_write(regs: memoryview, pin: int, value: bool) -> None:
+    # Level first, then direction, so a pin switching to output never glitches
+    if _GPIOMEM_SOC == "rp1":
+        regs[_RP1_RIO_OUT + (_RP1_RIO_SET if value else _RP1_RIO_CLR)] = 1 << pin
+        if not regs[_RP1_RIO_OE] >> pin & 1:
+            regs[_RP1_RIO_OE + _RP1_RIO_SET] = 1 << pin
+        if not _rp1_is_rio(regs, pin):
+            _rp1_to_rio(regs, pin)
+        return
+    regs[(_GPSET0 if value else _GPCLR0) + pin // 32] = 1 << pin % 32
+    if _gpiomem_fsel(regs, pin) != _FSEL_OUTPUT:
+        _gpiomem_set_fsel(regs, pin, _FSEL_OUTPUT)
+
+
+def _gpiomem_write_many(regs: memoryview, levels: dict[int, bool]) -> None:
+    """
+    Set many pins with one store per set/clear register (each bit is a pin),
+    then make any that aren't outputs yet into outputs.
+    """
+    set_mask = clr_mask = 0
+    for pin, value in levels.items():
+        if value:
+            set_mask |= 1 << pin
+        else:
+            clr_mask |= 1 << pin
+    if _GPIOMEM_SOC == "rp1":
+        if set_mask:
+            regs[_RP1_RIO_OUT + _RP1_RIO_SET] = set_mask
+        if clr_mask:
+            regs[_RP1_RIO_OUT + _RP1_RIO_CLR] = clr_mask
+        regs[_RP1_RIO_OE + _RP1_RIO_SET] = set_mask | clr_mask
+        for pin in levels:
+            if not _rp1_is_rio(regs, pin):
+                _rp1_to_rio(regs, pin)
+        return
+    for bank in (0, 1):
+        if word := set_mask >> 32 * bank & 0xFFFFFFFF:
+            regs[_GPSET0 + bank] = word
+        if word := clr_mask >> 32 * bank & 0xFFFFFFFF:
+            regs[_GPCLR0 + bank] = word
+    for pin in levels:
+        if _gpiomem_fsel(regs, pin) != _FSEL_OUTPUT:
+            _gpiomem_set_fsel(regs, pin, _FSEL_OUTPUT)
+
+
+def _gpiomem_levels(regs: memoryview) -> int:
+    """Every pin's input level as one bitmask (bit n = GPIOn)."""
+    if _GPIOMEM_SOC == "rp1":
+        return regs[_RP1_RIO_IN]
+    return regs[_GPLEV0] | regs[_GPLEV0 + 1] << 32
+
+
+def _gpiomem_read(regs: memoryview, pin: int, pull_up: bool) -> bool:
+    if pull_up and _gpiomem_is_input(regs, pin):
+        _gpiomem_pull_up(regs, pin)
+    if _GPIOMEM_SOC == "rp1":
+        return bool(regs[_RP1_RIO_IN] >> pin & 1)
+    return bool(regs[_GPLEV0 + pin // 32] >> pin % 32 & 1)
+
+
+def _claim(pin: int, direction: str, lflags: int = 0, level: int = 0) -> None:
+    """Claim pin on the shared chip; a no-op when it is already claimed the same way."""
+    if _CLAIMED.get(pin) == (direction, lflags):
+        return
+    with _GPIO_LOCK:
+        if _CLAIMED.get(pin) == (direction, lflags):
+            return
+        if pin in _CLAIMED:
+            _release(pin)
+        if direction == "output":
+            lgpio.gpio_claim_output(_CHIP, pin, level, lflags)
+        elif direction == "alert":
+            lgpio.gpio_claim_alert(_CHIP, pin, lgpio.BOTH_EDGES, lflags)
+        else:
+            lgpio.gpio_claim_input(_CHIP, pin, lflags)
+        _CLAIMED[pin] = (direction, lflags)
+
+
+def _release(pin: int) -> None:
+    """Free pin's claim, together with the rest of its group if it was claimed as one."""
+    with _GPIO_LOCK:
+        for leader, members in _GROUPS.items():
+            if pin in members:
+                lgpio.group_free(_CHIP, leader)
+                for p in members:
+                    _CLAIMED.pop(p, None)
+                del _GROUPS[leader]
+                return
+        lgpio.gpio_free(_CHIP, pin)
+        del _CLAIMED[pin]
+
+
+_GPIOZERO_CACHE: dict[int, tuple[tuple, object]] = {}   # pin -> ((kind, options), gpiozero device)
+_GPIOZERO_KINDS = {"out": "DigitalOutputDevice", "in": "DigitalInputDevice",
+                   "pwm": "PWMOutputDevice"}
+
+
+def _gpiozero_device(pin: int, kind: str, **options):
+    """
+    Return the process's gpiozero device for pin, creating it on first use.
+    A pin holds one device at a time: asking for another kind (or other
+    options) closes the old one first. Raises RuntimeError without gpiozero.
+    """
+    key = (kind, tuple(sorted(options.items())))
+    cached = _GPIOZERO_CACHE.get(pin)
+    if cached is not None:
+        if cached[0] == key:
+            return cached[1]
+        del _GPIOZERO_CACHE[pin]
+        cached[1].close()
+    if not _HAS_GPIOZERO:
+        raise RuntimeError("gpiozero not installed. Run: pip install gpiozero lgpio")
+    d = getattr(_optional_module("gpiozero"), _GPIOZERO_KINDS[kind])(pin, **options)
+    _GPIOZERO_CACHE[pin] = (key, d)
+    return d
+
+
+@atexit.register
+def _close_gpiozero() -> None:
+    for _, d in _GPIOZERO_CACHE.values():
+        try:
+            d.close()
+        except Exception:
+            pass
+    _GPIOZERO_CACHE.clear()
+
+
+def _release_pwm(pin: int, ask_daemon: bool = False) -> bool:
+    """
+    Stop any PWM signal on pin so a digital write or mode change sticks:
+    pigpiod's (duty 0) and this process's gpiozero PWM device. pigpiod is
+    only asked about pins this process didn't start PWM on when ask_daemon
+    is set. Returns whether a signal was running; raises if it can't stop it.
+    """
+    stopped = False
+    if (pin in _PIGPIO_PWM or ask_daemon) and (pi := _get_pigpio()) is not None:
+        try:
+            running = pin in _PIGPIO_PWM or pi.get_PWM_dutycycle(pin) > 0
+        except _optional_module("pigpio").error:   # pin isn't in PWM mode
+            running = False
+        if running:
+            pi.set_PWM_dutycycle(pin, 0)
+            _PIGPIO_PWM.discard(pin)
+            stopped = True
+    cached = _GPIOZERO_CACHE.get(pin)
+    if cached is not None and cached[0][0] == "pwm":
+        del _GPIOZERO_CACHE[pin]
+        cached[1].close()
+        stopped = True
+    if stopped:
+        _PIN_STATE.pop(pin, None)
+    return stopped
+
+
+def _release_pwm_many(pins) -> dict[int, dict]:
+    """_release_pwm for each pin; {pin: error result} for those it failed on."""
+    errors = {}
+    for pin in pins:
+        try:
+            _release_pwm(pin, _ONE_SHOT)
+        except Exception as e:
+            errors[pin] = {"success": False, "error": f"could not stop PWM on pin {pin}: {e}"}
+    return errors
+
+
+def _write_pin(pin: int, value: bool, *, device: str | None = None,
+               description: str = "") -> dict:
+    if error := _release_pwm_many((pin,)):
+        return {**error[pin], "device": device, "description": description}
+    if _lgpio_writes(pin):
+        try:
+            if _CLAIMED.get(pin, ("",))[0] == "output":
+                lgpio.gpio_write(_CHIP, pin, int(value))
+            else:
+                _claim(pin, "output", level=int(value))
+            return {"success": True, "pin": pin, "value": value, "backend": "lgpio",
+                    "device": device, "description": description}
+        except lgpio.error as e:
+            return {"success": False, "error": f"lgpio: {e.value}",
+                    "device": device, "description": description}
+    elif (regs := _get_gpiomem()) is not None and pin < _GPIOMEM_PINS:
+        _unclaim(pin)
+        _gpiomem_write(regs, pin, value)
+        return {"success": True, "pin": pin, "value": value, "backend": "gpiomem",
+                "device": device, "description": description}
+    elif _pinctrl_available():
+        if _PIN_STATE.get(pin) == value:
+            # This process already drove the pin to value: skip the pinctrl call
+            return {"success": True, "pin": pin, "value": value, "backend": "cached",
+                    "device": device, "description": description}
+        _unclaim(pin)
+        if (error := _pinctrl_set(str(pin), "op", "dh" if value else "dl")) is not None:
+            _PIN_STATE.pop(pin, None)
+            return {"success": False, "error": error,
+                    "device": device, "description": description}
+        _PIN_STATE[pin] = value
+        return {"success": True, "pin": pin, "value": value, "backend": "pinctrl",
+                "device": device, "description": description}
     else:
-        os.environ.setdefault("GPIOZERO_PIN_FACTORY", "lgpio")
         try:
-            from gpiozero import LED
-            d = LED(pin)
+            d = _gpiozero_output(pin)
             d.on() if value else d.off()
-            d.close()
-            return {"success": True, "pin": pin, "value": value, "backend": "gpiozero"}
+            return {"success": True, "pin": pin, "value": value, "backend": "gpiozero",
+                    "device": device, "description": description}
         except Exception as e:
-            return {"success": False, "error": str(e)}
+            return {"success": False, "error": str(e),
+                    "device": device, "description": description}
+
+
+def _gpiozero_pwm(pin: int, frequency: float):
+    """
+    The pin's cached PWM device at frequency. A new frequency is set on the
+    running device instead of closing it and building another.
+    """
+    cached = _GPIOZERO_CACHE.get(pin)
+    key = ("pwm", (("frequency", frequency),))
+    if cached is not None and cached[0][0] == "pwm" and cached[0] != key:
+        cached[1].frequency = frequency
+        _GPIOZERO_CACHE[pin] = (key, cached[1])
+    return _gpiozero_device(pin, "pwm", frequency=frequency)
+
+
+def _gpiozero_output(pin: int):
+    """The pin's cached output device; how blink, pulse and _write_pin drive gpiozero."""
+    return _gpiozero_device(pin, "out", initial_value=None)
+
+
+@contextmanager
+def _held_output(pin: int):
+    """
+    Yield a handle for a run of writes to pin (see _write_pin_fast).
+    gpiozero gets the pin's cached device, skipping the backend checks on
+    every edge; lgpio already claims once per process, gpiomem is a register
+    write, and pinctrl has no persistent mode, so all three simply go through
+    _write_pin.
+    """
+    if _get_chip() is not None or _get_gpiomem() is not None or _pinctrl_available():
+        yield ("pin", pin)
+        return
+    _release_pwm(pin, _ONE_SHOT)
+    yield ("gpiozero", _gpiozero_output(pin))
+
+
+def _write_pin_fast(handle: tuple, value: bool) -> dict:
+    """Write through a handle from _held_output, skipping per-call device setup."""
+    kind, target = handle
+    if kind == "pin":
+        return _write_pin(target, value)
+    try:
+        target.on() if value else target.off()
+        return {"success": True, "pin": target.pin.number, "value": value, "backend": "gpiozero"}
+    except Exception as e:
+        return {"success": False, "error": str(e)}
+
+
+def _blink_lgpio(pin: int, times: int, on_ms: int, off_ms: int) -> bool:
+    """
+    Emit the whole blink as one lgpio pulse train and wait for it to finish.
+    The edges are timed by lgpio's own thread, not by Python sleeps.
+    Returns False when lgpio can't do it, so the caller falls back to a loop.
+    """
+    if times <= 0 or not _lgpio_writes(pin):
+        return False
+    try:
+        _release_pwm(pin, _ONE_SHOT)
+    except Exception:
+        return False   # the fallback loop reports it
+    try:
+        _claim(pin, "output")
+        lgpio.tx_pulse(_CHIP, pin, int(on_ms * 1000), int(off_ms * 1000), 0, times)
+        time.sleep((times * (on_ms + off_ms) - off_ms) / 1000)
+        while lgpio.tx_busy(_CHIP, pin, lgpio.TX_PWM):
+            time.sleep(0.001)
+        lgpio.gpio_write(_CHIP, pin, 0)
+    except lgpio.error:
+        return False
+    return True
+
+
+# `pinctrl get` lines look like b'17: op dh pd | hi // GPIO17 = output'
+_PINCTRL_RE = re.compile(rb"\|\s*(hi|lo)\b")
+_PINCTRL_LINE_RE = re.compile(rb"^\s*(\d+):(.*)$", re.MULTILINE)
+
+
+def _parse_pinctrl_level(line: bytes) -> bool | None:
+    """Parse the level from one `pinctrl get` line; None if it shows none."""
+    m = _PINCTRL_RE.search(line)
+    return m.group(1) == b"hi" if m else None
 
 
-def _read_pin(pin: int, pull_up: bool = False) -> dict:
-    if _pinctrl_available():
+def _read_pin_pinctrl(pin: int, *, device: str | None = None,
+                      description: str = "") -> dict:
+    try:
+        r = subprocess.run(
+            [_pinctrl_path(), "get", str(pin)],
+            check=True, capture_output=True,
+        )
+        value = _parse_pinctrl_level(r.stdout)
+        _PIN_STATE.pop(pin, None)   # the pin may have been changed from outside
+        return {"success": True, "pin": pin, "value": value, "backend": "pinctrl",
+                "device": device, "description": description}
+    except subprocess.CalledProcessError as e:
+        return {"success": False, "error": e.stderr.decode(errors="replace").strip(),
+                "device": device, "description": description}
+
+
+def _read_pin(pin: int, pull_up: bool = False, *, device: str | None = None,
+              description: str = "") -> dict:
+    if _get_chip() is not None:
         try:
-            r = subprocess.run(
-                ["pinctrl", "get", str(pin)],
-                check=True, capture_output=True, text=True,
-            )
-            raw = r.stdout.strip()
-            after_pipe = raw.split("|")[1].strip() if "|" in raw else ""
-            token = after_pipe.split()[0].lower() if after_pipe else ""
-            value = (token == "hi") if token in ("hi", "lo") else None
-            return {"success": True, "pin": pin, "value": value, "backend": "pinctrl"}
-        except subprocess.CalledProcessError as e:
-            return {"success": False, "error": e.stderr.strip()}
+            claimed = _CLAIMED.get(pin)
+            if claimed is None and lgpio.gpio_get_mode(_CHIP, pin) & 2:
+                # An output we don't own yet: claiming it as an input would float
+                # the pin, so read the level without touching the line.
+                if (regs := _get_gpiomem()) is not None and pin < _GPIOMEM_PINS:
+                    return {"success": True, "pin": pin, "backend": "gpiomem",
+                            "value": _gpiomem_read(regs, pin, False),
+                            "device": device, "description": description}
+                if _pinctrl_available():
+                    return _read_pin_pinctrl(pin, device=device, description=description)
+            lflags = lgpio.SET_PULL_UP if pull_up else 0
+            if claimed is None or (claimed[0] != "output" and claimed != ("alert", lflags)):
+                _claim(pin, "input", lflags)
+            value = bool(lgpio.gpio_read(_CHIP, pin))
+            return {"success": True, "pin": pin, "value": value, "backend": "lgpio",
+                    "device": device, "description": description}
+        except lgpio.error as e:
+            return {"success": False, "error": f"lgpio: {e.value}",
+                    "device": device, "description": description}
+    elif (regs := _get_gpiomem()) is not None and pin < _GPIOMEM_PINS:
+        return {"success": True, "pin": pin, "value": _gpiomem_read(regs, pin, pull_up),
+                "backend": "gpiomem", "device": device, "description": description}
+    elif _pinctrl_available():
+        return _read_pin_pinctrl(pin, device=device, description=description)
     else:
-        os.environ.setdefault("GPIOZERO_PIN_FACTORY", "lgpio")
         try:
-            from gpiozero import Button
-            d = Button(pin, pull_up=pull_up)
-            value = bool(d.is_pressed)
-            d.close()
-            return {"success": True, "pin": pin, "value": value, "backend": "gpiozero"}
+            cached = _GPIOZERO_CACHE.get(pin)
+            if cached is not None and cached[0][0] != "in":
+                # Our own output: report what it drives instead of turning it into an input
+                value = bool(cached[1].value)
+            else:
+                value = bool(_gpiozero_device(pin, "in", pull_up=pull_up).pin.state)
+            return {"success": True, "pin": pin, "value": value, "backend": "gpiozero",
+                    "device": device, "description": description}
         except Exception as e:
-            return {"success": False, "error": str(e)}
+            return {"success": False, "error": str(e),
+                    "device": device, "description": description}
 
 
-def _set_mode_pinctrl(pin: int, mode: str) -> dict:
-    """Set pin direction without changing level (pinctrl only)."""
-    flag = "ip" if mode == "input" else "op"
+def _batch_read_pins(pins: list[tuple[int, bool]]) -> dict[int, dict]:
+    """
+    Read many (pin, pull_up) pairs at once and return {pin: result}.
+    lgpio reads each pull-up setting as one claimed group, gpiomem reads
+    the level registers once, and pinctrl reads every pin with a single
+    `pinctrl get a,b,c`.
+    """
+    if _get_chip() is not None:
+        return _batch_read_lgpio(pins)
+    if (regs := _get_gpiomem()) is not None and all(pin < _GPIOMEM_PINS for pin, _ in pins):
+        for pin, pull_up in pins:
+            if pull_up and _gpiomem_is_input(regs, pin):
+                _gpiomem_pull_up(regs, pin)
+        levels = _gpiomem_levels(regs)
+        return {pin: {"success": True, "pin": pin, "value": bool(levels >> pin & 1),
+                      "backend": "gpiomem"} for pin, _ in pins}
+    if _pinctrl_available() and pins:
+        return _batch_read_pinctrl([pin for pin, _ in pins])
+    return {pin: _read_pin(pin, pull_up) for pin, pull_up in pins}
+
+
+def _batch_write_pins(levels: dict[int, bool]) -> dict[int, dict]:
+    """
+    Drive many pins at once and return {pin: result}. gpiomem sets them with
+    one store per set/clear register; pinctrl takes a comma-separated pin
+    list per level, so it needs at most two processes (one for dh, one for
+    dl); lgpio and gpiozero write the pins in turn.
+    """
+    if not any(map(_lgpio_writes, levels)) and (regs := _get_gpiomem()) is not None \
+            and all(pin < _GPIOMEM_PINS for pin in levels):
+        results = _release_pwm_many(levels)
+        levels = {pin: value for pin, value in levels.items() if pin not in results}
+        for pin in levels:
+            _unclaim(pin)
+        _gpiomem_write_many(regs, levels)
+        results.update({pin: {"success": True, "pin": pin, "value": value, "backend": "gpiomem"}
+                        for pin, value in levels.items()})
+        return results
+    if any(map(_lgpio_writes, levels)) or _get_gpiomem() is not None or not _pinctrl_available():
+        return {pin: _write_pin(pin, value) for pin, value in levels.items()}
+
+    results = _release_pwm_many(levels)
+    results.update({pin: {"success": True, "pin": pin, "value": value, "backend": "cached"}
+                    for pin, value in levels.items()
+                    if pin not in results and _PIN_STATE.get(pin) == value})
+    for value in (True, False):
+        pins = [pin for pin, v in levels.items() if v == value and pin not in results]
+        if not pins:
+            continue
+        for p in pins:
+            _unclaim(p)
+        error = _pinctrl_set(",".join(map(str, pins)), "op", "dh" if value else "dl")
+        if error is not None:
+            results.update({p: {"success": False, "error": error} for p in pins})
+            for p in pins:
+                _PIN_STATE.pop(p, None)
+            continue
+        results.update({p: {"success": True, "pin": p, "value": value,
+                            "backend": "pinctrl"} for p in pins})
+        _PIN_STATE.update(dict.fromkeys(pins, value))
+    return results
+
+
+def _batch_read_lgpio(pins: list[tuple[int, bool]]) -> dict[int, dict]:
+    by_flags: dict[int, list[int]] = {}
+    for pin, pull_up in pins:
+        by_flags.setdefault(lgpio.SET_PULL_UP if pull_up else 0, []).append(pin)
+
+    with _GPIO_LOCK:  # group claims must not interleave with a parallel step's _claim
+        results = {}
+        for lflags, wanted in by_flags.items():
+            loose = [p for p in wanted if p not in _CLAIMED]
+            if len(loose) > 1:
+                try:
+                    lgpio.group_claim_input(_CHIP, loose, lflags)
+                    _GROUPS[loose[0]] = tuple(loose)
+                    _CLAIMED.update({p: ("input", lflags) for p in loose})
+                except lgpio.error:
+                    pass  # e.g. one pin is busy elsewhere — read them one by one below
+            for leader, members in _GROUPS.items():
+                if _CLAIMED.get(leader) != ("input", lflags) or not set(members) & set(wanted):
+                    continue
+                try:
+                    _, bits = lgpio.group_read(_CHIP, leader)
+                except lgpio.error:
+                    continue
+                for i, p in enumerate(members):
+                    results[p] = {"success": True, "pin": p, "value": bool(bits >> i & 1),
+                                  "backend": "lgpio"}
+            for p in wanted:
+                if p not in results:
+                    results[p] = _read_pin(p, lflags != 0)
+    return results
+
+
+def _batch_read_pinctrl(pins: list[int]) -> dict[int, dict]:
     try:
-        subprocess.run(
-            ["pinctrl", "set", str(pin), flag],
-            check=True, capture_output=True, text=True,
+        r = subprocess.run(
+            [_pinctrl_path(), "get", ",".join(str(p) for p in pins)],
+            check=True, capture_output=True,
         )
-        return {"success": True, "pin": pin, "mode": mode, "backend": "pinctrl"}
     except subprocess.CalledProcessError as e:
-        return {"success": False, "error": e.stderr.strip()}
+        error = e.stderr.decode(errors="replace").strip()
+        return {p: {"success": False, "error": error} for p in pins}
+
+    for p in pins:
+        _PIN_STATE.pop(p, None)   # the pins may have been changed from outside
+    results = {}
+    for m in _PINCTRL_LINE_RE.finditer(r.stdout):
+        p = int(m.group(1))
+        results[p] = {"success": True, "pin": p, "value": _parse_pinctrl_level(m.group(2)),
+                      "backend": "pinctrl"}
+    return {p: results.get(p) or {"success": False, "error": f"pinctrl returned no state for pin {p}"}
+            for p in pins}
+
+
+@functools.lru_cache(maxsize=1)
+def _sysfs_base() -> int:
+    """Sysfs number of line 0 on GPIOCHIP (newer kernels offset it, e.g. 512 or 571)."""
+    for chip in SYSFS_GPIO.glob("gpiochip*"):
+        if Path(os.path.realpath(chip / "device")).name == f"gpiochip{GPIOCHIP}":
+            return int((chip / "base").read_text())
+    return 0
+
+
+def _sysfs_node(pin: int) -> Path:
+    return SYSFS_GPIO / f"gpio{_sysfs_base() + pin}"
+
+
+def _sysfs_value_fd(pin: int) -> io.FileIO:
+    """Export pin as a sysfs input once and keep its value file open in bytes mode."""
+    fd = _PIN_FD_CACHE.get(pin)
+    if fd is None:
+        gpio = _sysfs_base() + pin
+        node = _sysfs_node(pin)
+        if not node.exists():
+            (SYSFS_GPIO / "export").write_text(str(gpio))
+            _SYSFS_EXPORTED.append(gpio)
+        (node / "direction").write_text("in")
+        _PIN_STATE.pop(pin, None)
+        fd = _PIN_FD_CACHE[pin] = open(node / "value", "rb", buffering=0)
+    return fd
+
+
+def _fast_read_pin(pin: int) -> int:
+    """
+    Read a pin's level (0 or 1) with minimal per-call work, for polling loops.
+    Uses the pin's lgpio claim if it has one, else a cached sysfs value file.
+    Raises OSError if neither is usable.
+    """
+    if pin in _CLAIMED:
+        try:
+            return lgpio.gpio_read(_CHIP, pin)
+        except lgpio.error as e:
+            raise OSError(f"lgpio: {e.value}")
+    fd = _sysfs_value_fd(pin)
+    fd.seek(0)
+    return fd.read()[0] - 48   # b"0\n" / b"1\n"
+
+
+@atexit.register
+def _close_sysfs() -> None:
+    for fd in _PIN_FD_CACHE.values():
+        fd.close()
+    _PIN_FD_CACHE.clear()
+    for gpio in _SYSFS_EXPORTED:
+        try:
+            (SYSFS_GPIO / "unexport").write_text(str(gpio))
+        except OSError:
+            pass
+
+
+def _claim_alert(pin: int, pull_up: bool) -> None:
+    """
+    Claim pin for edge alerts (wait_for, watch). Refuses a pin this process
+    drives as an output: re-claiming it as an input would drop its level.
+    """
+    if _CLAIMED.get(pin, ("",))[0] == "output":
+        raise OSError(f"pin {pin} is driven as an output by this process; "
+                      "set_mode it to input before waiting on it")
+    _claim(pin, "alert", lgpio.SET_PULL_UP if pull_up else 0)
+
+
+def _wait_level_lgpio(pin: int, pull_up: bool, state: bool, timeout_s: float) -> bool:
+    """Sleep on lgpio edge alerts until pin reads state; False on timeout."""
+    try:
+        _claim_alert(pin, pull_up)
+        reached = threading.Event()
+
+        def on_edge(chip, gpio, level, tick):
+            if level == int(state):
+                reached.set()
+
+        cb = lgpio.callback(_CHIP, pin, lgpio.BOTH_EDGES, on_edge)
+        try:
+            # Checked after the callback is armed so an edge in between isn't missed
+            if lgpio.gpio_read(_CHIP, pin) == int(state):
+                return True
+            return reached.wait(timeout_s)
+        finally:
+            cb.cancel()
+    except lgpio.error as e:
+        raise OSError(f"lgpio: {e.value}")
+
 
+def _wait_level_sysfs(pin: int, state: bool, timeout_s: float) -> bool | None:
+    """
+    Sleep in epoll on the sysfs value file (EPOLLPRI fires on each edge)
+    until pin reads state. Returns None if sysfs edges are unavailable.
+    """
+    try:
+        _sysfs_value_fd(pin)
+        (_sysfs_node(pin) / "edge").write_text("both")
+    except OSError:
+        return None
+
+    if timeout_s <= 0:
+        return _fast_read_pin(pin) == int(state)
+    ep = select.epoll()
+    tfd = None
+    try:
+        ep.register(_PIN_FD_CACHE[pin].fileno(), select.EPOLLPRI | select.EPOLLERR)
+        if hasattr(os, "timerfd_create"):   # Python 3.13+
+            # The kernel tracks the deadline: one poll wakes on an edge or the timeout
+            tfd = os.timerfd_create(time.CLOCK_MONOTONIC)
+            os.timerfd_settime(tfd, initial=timeout_s)
+            ep.register(tfd, select.EPOLLIN)
+            while True:
+                if _fast_read_pin(pin) == int(state):   # reading also re-arms the edge
+                    return True
+                if any(fd == tfd for fd, _ in ep.poll()):
+                    return False
+
+        deadline = time.monotonic() + timeout_s
+        while True:
+            if _fast_read_pin(pin) == int(state):
+                return True
+            remaining = deadline - time.monotonic()
+            if remaining <= 0 or not ep.poll(remaining):
+                return False
+    finally:
+        ep.close()
+        if tfd is not None:
+            os.close(tfd)
+
+
+def _wait_level_gpiozero(pin: int, pull_up: bool, state: bool, timeout_s: float) -> bool | None:
+    """
+    Wait on the pin's cached gpiozero input device, which wakes on the pin
+    factory's edge callback. Returns None if gpiozero can't be used here.
+    """
+    cached = _GPIOZERO_CACHE.get(pin)
+    if not _HAS_GPIOZERO or (cached is not None and cached[0][0] != "in"):
+        return None   # no gpiozero, or the pin is our own output
+    try:
+        d = _gpiozero_device(pin, "in", pull_up=pull_up)
+    except Exception:
+        return None   # let the polling loop report the error
+    # With pull_up the device is active LOW, so HIGH means inactive
+    if state != pull_up:
+        return bool(d.wait_for_active(timeout=timeout_s))
+    return bool(d.wait_for_inactive(timeout=timeout_s))
+
+
+def _wait_level_poll(pin: int, pull_up: bool, state: bool,
+                     timeout_s: float, poll_ms: int) -> bool:
+    """Poll _read_pin every poll_ms until pin reads state; False on timeout."""
+    deadline = time.monotonic() + timeout_s
+    while True:
+        r = _read_pin(pin, pull_up)
+        if not r.get("success"):
+            raise OSError(r.get("error"))
+        if r.get("value") == state:
+            return True
+        if time.monotonic() >= deadline:
+            return False
+        time.sleep(poll_ms / 1000)
 
-def _write_pwm(pin: int, duty_cycle: float, frequency: float = 100.0) -> dict:
+
+def _set_mode_pin(pin: int, mode: str) -> dict:
+    """Set pin direction without changing level (lgpio, gpiomem or pinctrl)."""
+    if error := _release_pwm_many((pin,)):
+        return error[pin]
+    if _lgpio_writes(pin):
+        try:
+            if mode == "input":
+                _claim(pin, "input")
+            elif _CLAIMED.get(pin, ("",))[0] != "output":
+                # Drive the level the pin currently reads at
+                current = _read_pin(pin)
+                _claim(pin, "output", level=int(bool(current.get("value"))))
+            return {"success": True, "pin": pin, "mode": mode, "backend": "lgpio"}
+        except lgpio.error as e:
+            return {"success": False, "error": f"lgpio: {e.value}"}
+
+    _unclaim(pin)
+    if (regs := _get_gpiomem()) is not None and pin < _GPIOMEM_PINS:
+        if mode == "input":
+            _gpiomem_set_input(regs, pin)
+        else:
+            _gpiomem_write(regs, pin, _gpiomem_read(regs, pin, False))
+        return {"success": True, "pin": pin, "mode": mode, "backend": "gpiomem"}
+
+    if not _pinctrl_available():
+        return {"success": False,
+                "error": f"set_mode on pin {pin} requires lgpio or pinctrl "
+                         f"(/dev/gpiomem covers pins 0–{_GPIOMEM_PINS - 1})"}
+    flag = "ip" if mode == "input" else "op"
+    _PIN_STATE.pop(pin, None)
+    if (error := _pinctrl_set(str(pin), flag)) is not None:
+        return {"success": False, "error": error}
+    return {"success": True, "pin": pin, "mode": mode, "backend": "pinctrl"}
+
+
+_PIGPIO_RANGE = 10000                  # duty cycle steps per PWM pin on pigpio
+_PIGPIO_PWM: set[int] = set()          # pins this process is running pigpio PWM on
+
+
+@functools.lru_cache(maxsize=1)
+def _get_pigpio():
+    """
+    The process's connection to a running pigpiod, or None when pigpio isn't
+    installed or the daemon isn't reachable (it never is on a Pi 5).
+    """
+    pigpio = _optional_module("pigpio")
+    if pigpio is None:
+        return None
+    # pigpio prints its connection failure banner to stdout; keep it out of our JSON
+    with redirect_stdout(io.StringIO()):
+        pi = pigpio.pi()
+    if not pi.connected:
+        return None
+    atexit.register(pi.stop)
+    return pi
+
+
+def _write_pwm_pigpio(pi, pin: int, duty_cycle: float, frequency: float) -> None:
+    """DMA-timed PWM from pigpiod: keeps running with no CPU cost on our side."""
+    if pin not in _PIGPIO_PWM:
+        pi.set_PWM_range(pin, _PIGPIO_RANGE)
+        _PIGPIO_PWM.add(pin)
+    pi.set_PWM_frequency(pin, int(frequency))
+    pi.set_PWM_dutycycle(pin, round(duty_cycle * _PIGPIO_RANGE))
+
+
+def _write_pwm(pin: int, duty_cycle: float, frequency: float = 100.0, *,
+               device: str | None = None, description: str = "") -> dict:
     if not 0.0 <= duty_cycle <= 1.0:
-        return {"success": False, "error": "duty_cycle must be 0.0–1.0"}
-    os.environ.setdefault("GPIOZERO_PIN_FACTORY", "lgpio")
+        return {"success": False, "error": "duty_cycle must be 0.0–1.0",
+                "device": device, "description": description}
+    _PIN_STATE.pop(pin, None)
+    if (pi := _get_pigpio()) is not None:
+        try:
+            _write_pwm_pigpio(pi, pin, duty_cycle, frequency)
+            return {"success": True, "pin": pin, "duty_cycle": duty_cycle,
+                    "frequency": pi.get_PWM_frequency(pin), "backend": "pigpio",
+                    "device": device, "description": description}
+        except Exception as e:   # pigpio.error, or the daemon went away
+            return {"success": False, "error": f"pigpio: {e}",
+                    "device": device, "description": description}
     try:
-        from gpiozero import PWMOutputDevice
-        import time
-        d = PWMOutputDevice(pin, frequency=frequency)
-        d.value = duty_cycle
-        time.sleep(0.05)
-        d.close()
+        _gpiozero_pwm(pin, frequency).value = duty_cycle
         return {"success": True, "pin": pin, "duty_cycle": duty_cycle,
-                "frequency": frequency, "backend": "gpiozero"}
+                "frequency": frequency, "backend": "gpiozero",
+                "device": device, "description": description}
     except Exception as e:
-        return {"success": False, "error": str(e)}
+        return {"success": False, "error": str(e),
+                "device": device, "description": description}
 
 
 # ---------------------------------------------------------------------------
 # Public API
 # ---------------------------------------------------------------------------
 
-def activate(identifier: str | int, config: dict | None = None) -> dict:
-    """Turn on a pin — accepts name or BCM pin number."""
-    config = config or load_config()
+def _set(identifier: str | int, on: bool, config: dict | None) -> dict:
+    """Drive a device on or off; active_low devices get the opposite level."""
+    if config is None:
+        config = _shared_config()
     try:
         pin, device = _resolve(identifier, config)
     except ValueError as e:
         return {"success": False, "error": str(e)}
 
-    value = not device.get("active_low", False)
-    result = _write_pin(pin, value)
-    result.update({"device": str(identifier), "description": device.get("description", "")})
-    return result
+    return _write_pin(pin, on ^ bool(device.get("active_low", False)),
+                      device=str(identifier), description=device.get("description", ""))
+
+
+def activate(identifier: str | int, config: dict | None = None) -> dict:
+    """Turn on a pin — accepts name or BCM pin number."""
+    return _set(identifier, True, config)
 
 
 def deactivate(identifier: str | int, config: dict | None = None) -> dict:
     """Turn off a pin — accepts name or BCM pin number."""
-    config = config or load_config()
+    return _set(identifier, False, config)
+
+
+def toggle(identifier: str | int, config: dict | None = None) -> dict:
+    """Toggle a pin (on→off, off→on) — accepts name or BCM pin number."""
+    if config is None:
+        config = _shared_config()
     try:
         pin, device = _resolve(identifier, config)
     except ValueError as e:
         return {"success": False, "error": str(e)}
 
-    value = device.get("active_low", False)
-    result = _write_pin(pin, value)
-    result.update({"device": str(identifier), "description": device.get("description", "")})
-    return result
-
-
-def toggle(identifier: str | int, config: dict | None = None) -> dict:
-    """Toggle a pin (on→off, off→on) — accepts name or BCM pin number."""
-    config = config or load_config()
-    current = read(identifier, config)
+    current = _read_pin(pin, device.get("pull_up", False))
     if not current.get("success"):
         return current
-    if current.get("value"):
-        return deactivate(identifier, config)
-    return activate(identifier, config)
+    # Flip the raw level, so active_low devices toggle correctly too
+    return _write_pin(pin, not current["value"],
+                      device=str(identifier), description=device.get("description", ""))
+
+
+def _switch_many(identifiers: list[str | int], on: bool, config: dict | None) -> dict:
+    if config is None:
+        config = _shared_config()
+    levels = {}
+    names = {}
+    for identifier in identifiers:
+        try:
+            pin, device = _resolve(identifier, config)
+        except ValueError as e:
+            return {"success": False, "error": str(e)}   # nothing written yet
+        levels[pin] = on ^ bool(device.get("active_low", False))
+        names[str(identifier)] = pin
+
+    written = _batch_write_pins(levels)
+    results = {}
+    errors = {}
+    for name, pin in names.items():
+        r = written[pin]
+        if r.get("success"):
+            results[name] = {"pin": pin, "value": r["value"], "backend": r["backend"]}
+        else:
+            errors[name] = r.get("error")
+
+    return {
+        "success": not errors,
+        "devices": results,
+        **({"errors": errors, "error": f"{len(errors)} device(s) failed"} if errors else {}),
+    }
+
+
+def activate_many(identifiers: list[str | int], config: dict | None = None) -> dict:
+    """Turn on several pins at once — a scene change costs one pinctrl call, not one per pin."""
+    return _switch_many(identifiers, True, config)
+
+
+def deactivate_many(identifiers: list[str | int], config: dict | None = None) -> dict:
+    """Turn off several pins at once — the counterpart of activate_many."""
+    return _switch_many(identifiers, False, config)
 
 
 def read(identifier: str | int, config: dict | None = None) -> dict:
     """Read current state of a pin — accepts name or BCM pin number."""
-    config = config or load_config()
+    if config is None:
+        config = _shared_config()
     try:
         pin, device = _resolve(identifier, config)
     except ValueError as e:
         return {"success": False, "error": str(e)}
 
-    result = _read_pin(pin, device.get("pull_up", False))
-    result.update({"device": str(identifier), "description": device.get("description", "")})
-    return result
+    return _read_pin(pin, device.get("pull_up", False),
+                     device=str(identifier), description=device.get("description", ""))
 
 
 def set_level(identifier: str | int, level: float, config: dict | None = None) -> dict:
     """Set PWM level (0.0–1.0) — accepts name or BCM pin number."""
-    config = config or load_config()
+    if config is None:
+        config = _shared_config()
     try:
         pin, device = _resolve(identifier, config)
     except ValueError as e:
         return {"success": False, "error": str(e)}
 
-    result = _write_pwm(pin, level, device.get("frequency", 100.0))
-    result.update({"device": str(identifier), "description": device.get("description", "")})
-    return result
+    return _write_pwm(pin, level, device.get("frequency", 100.0),
+                      device=str(identifier), description=device.get("description", ""))
+
+
+def stop_pwm(identifier: str | int, config: dict | None = None) -> dict:
+    """
+    Stop the PWM (or servo) signal on a pin and release its device.
+    set / set_angle keep the signal running until this, or until the process exits.
+    """
+    if config is None:
+        config = _shared_config()
+    try:
+        pin, _ = _resolve(identifier, config)
+    except ValueError as e:
+        return {"success": False, "error": str(e)}
+
+    _PIN_STATE.pop(pin, None)
+    try:
+        # Ask the daemon too: the PWM may have been started by an earlier CLI run
+        stopped = _release_pwm(pin, ask_daemon=True)
+    except Exception as e:
+        return {"success": False, "error": str(e)}
+    return {"success": True, "pin": pin, "device": str(identifier), "stopped": stopped}
 
 
 def blink(identifier: str | int, times: int = 3,
@@ -236,22 +1335,31 @@ def blink(identifier: str | int, times: int = 3,
     Blink a pin N times.
     on_ms / off_ms: milliseconds the pin stays HIGH / LOW per cycle.
     """
-    config = config or load_config()
+    if config is None:
+        config = _shared_config()
     try:
         pin, _ = _resolve(identifier, config)
     except ValueError as e:
         return {"success": False, "error": str(e)}
 
-    for i in range(times):
-        r = _write_pin(pin, True)
-        if not r.get("success"):
-            return {**r, "completed_cycles": i}
-        time.sleep(on_ms / 1000)
-        r = _write_pin(pin, False)
-        if not r.get("success"):
-            return {**r, "completed_cycles": i}
-        if i < times - 1:
-            time.sleep(off_ms / 1000)
+    if _blink_lgpio(pin, times, on_ms, off_ms):
+        return {"success": True, "pin": pin, "device": str(identifier),
+                "times": times, "on_ms": on_ms, "off_ms": off_ms}
+
+    try:
+        with _held_output(pin) as out:
+            for i in range(times):
+                r = _write_pin_fast(out, True)
+                if not r.get("success"):
+                    return {**r, "completed_cycles": i}
+                time.sleep(on_ms / 1000)
+                r = _write_pin_fast(out, False)
+                if not r.get("success"):
+                    return {**r, "completed_cycles": i}
+                if i < times - 1:
+                    time.sleep(off_ms / 1000)
+    except Exception as e:
+        return {"success": False, "error": str(e), "completed_cycles": 0}
 
     return {"success": True, "pin": pin, "device": str(identifier),
             "times": times, "on_ms": on_ms, "off_ms": off_ms}
@@ -263,7 +1371,8 @@ def pulse(identifier: str | int, duration_ms: int = 1000,
     Set a pin HIGH for duration_ms milliseconds, then LOW again.
     Useful for triggering relays, door openers, buzzers.
     """
-    config = config or load_config()
+    if config is None:
+        config = _shared_config()
     try:
         pin, device = _resolve(identifier, config)
     except ValueError as e:
@@ -272,13 +1381,17 @@ def pulse(identifier: str | int, duration_ms: int = 1000,
     value_on  = not device.get("active_low", False)
     value_off = device.get("active_low", False)
 
-    r = _write_pin(pin, value_on)
-    if not r.get("success"):
-        return r
-    time.sleep(duration_ms / 1000)
-    r = _write_pin(pin, value_off)
-    if not r.get("success"):
-        return r
+    try:
+        with _held_output(pin) as out:
+            r = _write_pin_fast(out, value_on)
+            if not r.get("success"):
+                return r
+            time.sleep(duration_ms / 1000)
+            r = _write_pin_fast(out, value_off)
+            if not r.get("success"):
+                return r
+    except Exception as e:
+        return {"success": False, "error": str(e)}
 
     return {"success": True, "pin": pin, "device": str(identifier),
             "duration_ms": duration_ms}
@@ -293,33 +1406,146 @@ def wait_for(identifier: str | int, state: bool = True,
 
     Ideal for sensors: wait_for("motion_sensor", state=True, timeout_s=60)
     Returns elapsed_s and whether the state was reached.
+
+    Sleeps on edge events (lgpio alerts, else sysfs epoll, else gpiozero's
+    wait_for_active/inactive); poll_ms is only used when none is available.
     """
-    config = config or load_config()
+    if config is None:
+        config = _shared_config()
     try:
         pin, device = _resolve(identifier, config)
     except ValueError as e:
         return {"success": False, "error": str(e)}
 
     pull_up = device.get("pull_up", False)
-    deadline = time.monotonic() + timeout_s
-    interval = poll_ms / 1000
+    start = time.monotonic()
+    try:
+        if _get_chip() is not None:
+            reached = _wait_level_lgpio(pin, pull_up, state, timeout_s)
+        else:
+            reached = _wait_level_sysfs(pin, state, timeout_s)
+            if reached is None:
+                reached = _wait_level_gpiozero(pin, pull_up, state, timeout_s)
+            if reached is None:
+                reached = _wait_level_poll(pin, pull_up, state, timeout_s, poll_ms)
+    except OSError as e:
+        return {"success": False, "error": str(e)}
 
-    while time.monotonic() < deadline:
-        r = _read_pin(pin, pull_up)
-        if not r.get("success"):
-            return r
-        if r.get("value") == state:
-            elapsed = round(timeout_s - (deadline - time.monotonic()), 3)
-            return {"success": True, "pin": pin, "device": str(identifier),
-                    "value": state, "elapsed_s": elapsed,
-                    "description": device.get("description", "")}
-        time.sleep(interval)
+    if reached:
+        return {"success": True, "pin": pin, "device": str(identifier),
+                "value": state, "elapsed_s": round(time.monotonic() - start, 3),
+                "description": device.get("description", "")}
 
     return {"success": False, "timed_out": True, "pin": pin,
             "device": str(identifier), "timeout_s": timeout_s,
             "error": f"Timed out after {timeout_s}s — pin never reached {'HIGH' if state else 'LOW'}"}
 
 
+def _watch_lgpio(pin: int, pull_up: bool, record, done: threading.Event,
+                 duration_s: float) -> None:
+    """Record every edge from lgpio's alert thread until done or duration_s."""
+    try:
+        _claim_alert(pin, pull_up)
+        cb = lgpio.callback(_CHIP, pin, lgpio.BOTH_EDGES,
+                            lambda chip, gpio, level, tick: level != 2 and record(level))
+        try:
+            done.wait(duration_s)
+        finally:
+            cb.cancel()
+    except lgpio.error as e:
+        raise OSError(f"lgpio: {e.value}")
+
+
+def _watch_sysfs(pin: int, record, done: threading.Event, duration_s: float) -> bool:
+    """Record level changes woken by sysfs edges in epoll; False if sysfs edges are unavailable."""
+    try:
+        last = _fast_read_pin(pin)
+        (_sysfs_node(pin) / "edge").write_text("both")
+    except OSError:
+        return False
+    ep = select.epoll()
+    try:
+        ep.register(_PIN_FD_CACHE[pin].fileno(), select.EPOLLPRI | select.EPOLLERR)
+        deadline = time.monotonic() + duration_s
+        while not done.is_set() and (remaining := deadline - time.monotonic()) > 0:
+            if ep.poll(remaining) and (level := _fast_read_pin(pin)) != last:
+                last = level
+                record(level)
+    finally:
+        ep.close()
+    return True
+
+
+def _watch_poll(pin: int, pull_up: bool, record, done: threading.Event,
+                duration_s: float, poll_ms: int) -> None:
+    """Record level changes seen by reading the pin every poll_ms."""
+    deadline = time.monotonic() + duration_s
+    last = None
+    while not done.is_set() and time.monotonic() < deadline:
+        r = _read_pin(pin, pull_up)
+        if not r.get("success"):
+            raise OSError(r.get("error"))
+        if last is not None and r["value"] != last:
+            record(r["value"])
+        last = r["value"]
+        time.sleep(poll_ms / 1000)
+
+
+def watch(identifier: str | int, duration_s: float = 10.0, max_events: int = 0,
+          poll_ms: int = 10, callback=None, config: dict | None = None) -> dict:
+    """
+    Record every level change on a pin for duration_s seconds, or until
+    max_events changes (0 = no limit). Returns the changes in order.
+
+    Woken by edge events (lgpio alerts, else sysfs epoll), so a quiet pin
+    costs no CPU; poll_ms is only used when neither is available.
+    callback, if given, is called with each event as it happens (from
+    lgpio's thread on that backend).
+    """
+    if config is None:
+        config = _shared_config()
+    try:
+        pin, device = _resolve(identifier, config)
+    except ValueError as e:
+        return {"success": False, "error": str(e)}
+
+    pull_up = device.get("pull_up", False)
+    events: list[dict] = []
+    done = threading.Event()
+    start = time.monotonic()
+
+    def record(level) -> None:
+        if done.is_set():
+            return
+        event = {"value": bool(level), "elapsed_s": round(time.monotonic() - start, 6)}
+        events.append(event)
+        if callback is not None:
+            callback(dict(event))
+        if max_events and len(events) >= max_events:
+            done.set()
+
+    try:
+        if _get_chip() is not None:
+            _watch_lgpio(pin, pull_up, record, done, duration_s)
+        elif not _watch_sysfs(pin, record, done, duration_s):
+            _watch_poll(pin, pull_up, record, done, duration_s, poll_ms)
+    except OSError as e:
+        return {"success": False, "error": str(e), "events": events}
+
+    return {"success": True, "pin": pin, "device": str(identifier),
+            "events": events, "count": len(events),
+            "elapsed_s": round(time.monotonic() - start, 3),
+            "description": device.get("description", "")}
+
+
+def _angle_to_duty(angle: float) -> float:
+    # Standard servo: 50 Hz, 1–2 ms pulse within 20 ms period
+    return (angle / 180.0 * 0.05) + 0.05   # maps 0° → 0.05, 180° → 0.10
+
+
+_ANGLE_LUT = tuple(_angle_to_duty(a) for a in range(181))   # whole degrees
+
+
 def set_angle(identifier: str | int, angle: float,
               config: dict | None = None) -> dict:
     """
@@ -330,16 +1556,17 @@ def set_angle(identifier: str | int, angle: float,
     if not 0 <= angle <= 180:
         return {"success": False, "error": "angle must be 0–180 degrees"}
 
-    config = config or load_config()
+    if config is None:
+        config = _shared_config()
     try:
-        pin, _ = _resolve(identifier, config)
+        pin, device = _resolve(identifier, config)
     except ValueError as e:
         return {"success": False, "error": str(e)}
 
-    # Standard servo: 50 Hz, 1–2 ms pulse within 20 ms period
-    duty = (angle / 180.0 * 0.05) + 0.05   # maps 0° → 0.05, 180° → 0.10
-    result = _write_pwm(pin, duty, frequency=50.0)
-    result.update({"device": str(identifier), "angle": angle})
+    duty = _ANGLE_LUT[int(angle)] if angle == int(angle) else _angle_to_duty(angle)
+    result = _write_pwm(pin, duty, frequency=50.0, device=str(identifier),
+                        description=device.get("description", ""))
+    result["angle"] = angle
     return result
 
 
@@ -347,20 +1574,21 @@ def set_mode(identifier: str | int, mode: str,
              config: dict | None = None) -> dict:
     """
     Explicitly set a pin as 'input' or 'output' without changing its level.
-    Requires pinctrl (Raspberry Pi 5).
+    Requires lgpio, /dev/gpiomem (/dev/gpiomem0 on the Pi 5) or pinctrl.
     """
     if mode not in ("input", "output"):
         return {"success": False, "error": "mode must be 'input' or 'output'"}
-    if not _pinctrl_available():
-        return {"success": False, "error": "set_mode requires pinctrl (Raspberry Pi 5 only)"}
+    if _get_chip() is None and _get_gpiomem() is None and not _pinctrl_available():
+        return {"success": False, "error": "set_mode requires lgpio, gpiomem or pinctrl"}
 
-    config = config or load_config()
+    if config is None:
+        config = _shared_config()
     try:
         pin, _ = _resolve(identifier, config)
     except ValueError as e:
         return {"success": False, "error": str(e)}
 
-    result = _set_mode_pinctrl(pin, mode)
+    result = _set_mode_pin(pin, mode)
     result["device"] = str(identifier)
     return result
 
@@ -370,21 +1598,20 @@ def read_all(config: dict | None = None) -> dict:
     Read all registered input/sensor pins in one call.
     Returns a dict of {device_name: value} for every input and sensor device.
     """
-    config = config or load_config()
+    if config is None:
+        config = _shared_config()
     results = {}
     errors = {}
 
-    for name, device in config.get("devices", {}).items():
-        if device.get("type") in ("input", "sensor"):
-            r = _read_pin(device["pin"], device.get("pull_up", False))
-            if r.get("success"):
-                results[name] = {
-                    "value": r.get("value"),
-                    "pin": device["pin"],
-                    "description": device.get("description", ""),
-                }
-            else:
-                errors[name] = r.get("error")
+    inputs = _input_rows(config.get("devices", {}))
+    readings = _batch_read_pins([(pin, pull_up) for _, pin, pull_up, _ in inputs])
+
+    for name, pin, _, description in inputs:
+        r = readings[pin]
+        if r.get("success"):
+            results[name] = {"value": r.get("value"), "pin": pin, "description": description}
+        else:
+            errors[name] = r.get("error")
 
     return {
         "success": True,
@@ -393,6 +1620,19 @@ def read_all(config: dict | None = None) -> dict:
     }
 
 
+_DHT_CACHE: dict[int, tuple[str, object]] = {}   # pin -> (sensor type, DHT device), kept between reads
+
+
+@atexit.register
+def _close_dht() -> None:
+    for _, dht in _DHT_CACHE.values():
+        try:
+            dht.exit()
+        except Exception:
+            pass
+    _DHT_CACHE.clear()
+
+
 def dht_read(identifier: str | int, sensor_type: str = "DHT22",
              config: dict | None = None) -> dict:
     """
@@ -402,14 +1642,14 @@ def dht_read(identifier: str | int, sensor_type: str = "DHT22",
 
     sensor_type: "DHT22" (default, more accurate) or "DHT11"
     """
-    try:
-        import adafruit_dht
-        import board
-    except ImportError:
+    adafruit_dht = _optional_module("adafruit_dht")
+    board = _optional_module("board")
+    if adafruit_dht is None or board is None:
         return {"success": False,
                 "error": "Missing library. Run: pip install adafruit-circuitpython-dht"}
 
-    config = config or load_config()
+    if config is None:
+        config = _shared_config()
     try:
         pin, _ = _resolve(identifier, config)
     except ValueError as e:
@@ -420,8 +1660,17 @@ def dht_read(identifier: str | int, sensor_type: str = "DHT22",
     if board_pin is None:
         return {"success": False, "error": f"BCM pin {pin} is not available as board.D{pin}"}
 
-    sensor_cls = adafruit_dht.DHT22 if sensor_type.upper() == "DHT22" else adafruit_dht.DHT11
-    dht = sensor_cls(board_pin, use_pulseio=False)
+    kind = "DHT22" if sensor_type.upper() == "DHT22" else "DHT11"
+    _PIN_STATE.pop(pin, None)   # the sensor protocol drives the line too
+    cached = _DHT_CACHE.get(pin)
+    if cached is not None and cached[0] == kind:
+        dht = cached[1]
+    else:
+        if cached is not None:
+            cached[1].exit()   # same pin, other sensor type: free the line first
+            del _DHT_CACHE[pin]
+        dht = getattr(adafruit_dht, kind)(board_pin, use_pulseio=False)
+        _DHT_CACHE[pin] = (kind, dht)
     try:
         temperature = dht.temperature   # Celsius
         humidity = dht.humidity         # %
@@ -438,8 +1687,51 @@ def dht_read(identifier: str | int, sensor_type: str = "DHT22",
         # DHT sensors occasionally fail to read — caller should retry
         return {"success": False, "error": f"Read failed (retry): {e}",
                 "pin": pin, "device": str(identifier)}
-    finally:
-        dht.exit()
+
+
+# Initialised LCDs, reused across calls:
+# (mode, i2c_address, rs_pin, e_pin, data_pins, cols, rows) -> CharLCD
+_LCD_CACHE: dict[tuple, object] = {}
+
+
+def _get_lcd(mode: str, i2c_address: int, rs_pin: int | None, e_pin: int | None,
+             data_pins: list[int] | None, cols: int, rows: int) -> tuple[tuple, object]:
+    """
+    Return (key, lcd) for this wiring, running the HD44780 init sequence only
+    the first time. Raises on a missing library or a failed init.
+    """
+    key = (mode, i2c_address, rs_pin, e_pin, tuple(data_pins or ()), cols, rows)
+    lcd = _LCD_CACHE.get(key)
+    if lcd is not None:
+        return key, lcd
+    rplcd = _optional_module("RPLCD." + mode)
+    if rplcd is None:
+        raise RuntimeError("Missing library. Run: pip install RPLCD smbus2")
+    if mode == "i2c":
+        lcd = rplcd.CharLCD(
+            i2c_expander="PCF8574",
+            address=i2c_address,
+            cols=cols, rows=rows,
+            dotsize=8,
+        )
+    else:
+        lcd = rplcd.CharLCD(
+            numbering_mode="BCM",
+            cols=cols, rows=rows,
+            pin_rs=rs_pin, pin_e=e_pin,
+            pins_data=list(data_pins),
+        )
+    _LCD_CACHE[key] = lcd
+    return key, lcd
+
+
+def _drop_lcd(key: tuple) -> None:
+    lcd = _LCD_CACHE.pop(key, None)
+    if lcd is not None:
+        try:
+            lcd.close(clear=False)
+        except Exception:
+            pass
 
 
 def lcd_print(text: str, line: int = 1,
@@ -457,45 +1749,30 @@ def lcd_print(text: str, line: int = 1,
     mode="gpio" — LCD wired directly to GPIO pins
                   Requires rs_pin, e_pin, and data_pins=[D4,D5,D6,D7]
 
+    The display stays initialised between calls; lcd_close() releases it.
+
     Requires: pip install RPLCD smbus2
     """
-    try:
-        from RPLCD.i2c import CharLCD as I2CLCD
-        from RPLCD.gpio import CharLCD as GPIOLCD
-    except ImportError:
+    if mode not in ("i2c", "gpio"):
+        return {"success": False, "error": "mode must be 'i2c' or 'gpio'"}
+    if mode == "gpio" and (not all([rs_pin, e_pin, data_pins]) or len(data_pins) != 4):
         return {"success": False,
-                "error": "Missing library. Run: pip install RPLCD smbus2"}
+                "error": "gpio mode requires rs_pin, e_pin, and data_pins=[D4,D5,D6,D7]"}
 
+    key = None
     try:
-        if mode == "i2c":
-            lcd = I2CLCD(
-                i2c_expander="PCF8574",
-                address=i2c_address,
-                cols=cols, rows=rows,
-                dotsize=8,
-            )
-        elif mode == "gpio":
-            if not all([rs_pin, e_pin, data_pins]) or len(data_pins) != 4:
-                return {"success": False,
-                        "error": "gpio mode requires rs_pin, e_pin, and data_pins=[D4,D5,D6,D7]"}
-            lcd = GPIOLCD(
-                numbering_mode="BCM",
-                cols=cols, rows=rows,
-                pin_rs=rs_pin, pin_e=e_pin,
-                pins_data=data_pins,
-            )
-        else:
-            return {"success": False, "error": "mode must be 'i2c' or 'gpio'"}
+        key, lcd = _get_lcd(mode, i2c_address, rs_pin, e_pin, data_pins, cols, rows)
 
         # Truncate / pad text to fit the line width
         display_text = text[:cols].ljust(cols)
         lcd.cursor_pos = (line - 1, 0)
         lcd.write_string(display_text)
-        lcd.close(clear=False)
 
         return {"success": True, "mode": mode, "line": line,
                 "cols": cols, "rows": rows, "text": display_text.rstrip()}
     except Exception as e:
+        if key is not None:
+            _drop_lcd(key)
         return {"success": False, "error": str(e)}
 
 
@@ -504,27 +1781,79 @@ def lcd_clear(cols: int = 16, rows: int = 2,
               rs_pin: int | None = None, e_pin: int | None = None,
               data_pins: list[int] | None = None) -> dict:
     """Clear all text from the LCD screen."""
+    if mode != "i2c":
+        if not all([rs_pin, e_pin, data_pins]):
+            return {"success": False, "error": "gpio mode requires rs_pin, e_pin, data_pins"}
+        mode = "gpio"
+    key = None
     try:
-        from RPLCD.i2c import CharLCD as I2CLCD
-        from RPLCD.gpio import CharLCD as GPIOLCD
-    except ImportError:
-        return {"success": False,
-                "error": "Missing library. Run: pip install RPLCD smbus2"}
-    try:
-        if mode == "i2c":
-            lcd = I2CLCD("PCF8574", address=i2c_address, cols=cols, rows=rows, dotsize=8)
-        else:
-            if not all([rs_pin, e_pin, data_pins]):
-                return {"success": False, "error": "gpio mode requires rs_pin, e_pin, data_pins"}
-            lcd = GPIOLCD("BCM", cols=cols, rows=rows,
-                          pin_rs=rs_pin, pin_e=e_pin, pins_data=data_pins)
+        key, lcd = _get_lcd(mode, i2c_address, rs_pin, e_pin, data_pins, cols, rows)
         lcd.clear()
-        lcd.close(clear=False)
         return {"success": True, "mode": mode}
     except Exception as e:
+        if key is not None:
+            _drop_lcd(key)
         return {"success": False, "error": str(e)}
 
 
+@atexit.register
+def lcd_close() -> dict:
+    """Release every LCD held open by lcd_print/lcd_clear. The text stays on screen."""
+    closed = len(_LCD_CACHE)
+    for key in list(_LCD_CACHE):
+        _drop_lcd(key)
+    return {"success": True, "closed": closed}
+
+
+# Open UARTs, reused across calls: port -> (Serial, Lock). One handle per
+# port: the baud rate is a setting of the tty, shared by every fd open on it.
+_SERIAL_POOL: dict[str, tuple] = {}
+_SERIAL_POOL_LOCK = threading.Lock()
+
+
+@contextmanager
+def _get_serial(port: str, baud: int, timeout: float):
+    """
+    Yield the open Serial for port at baud, opening it on first use.
+    The handle's lock is held for the duration; a port that raises is dropped
+    from the pool so the next call reopens it.
+    """
+    key = port
+    with _SERIAL_POOL_LOCK:
+        entry = _SERIAL_POOL.get(key)
+        if entry is None:
+            entry = (serial.Serial(port, baudrate=baud, timeout=timeout), threading.Lock())
+            _SERIAL_POOL[key] = entry
+    ser, lock = entry
+    with lock:
+        try:
+            if ser.baudrate != baud:
+                ser.baudrate = baud
+            if ser.timeout != timeout:
+                ser.timeout = timeout
+            yield ser
+        except Exception:
+            with _SERIAL_POOL_LOCK:
+                if _SERIAL_POOL.get(key) is entry:
+                    del _SERIAL_POOL[key]
+            try:
+                ser.close()
+            except Exception:
+                pass
+            raise
+
+
+@atexit.register
+def _close_serial() -> None:
+    with _SERIAL_POOL_LOCK:
+        for ser, _ in _SERIAL_POOL.values():
+            try:
+                ser.close()
+            except Exception:
+                pass
+        _SERIAL_POOL.clear()
+
+
 def serial_write(data: str, port: str = "/dev/serial0",
                  baud: int = 9600, encoding: str = "utf-8") -> dict:
     """
@@ -532,14 +1861,12 @@ def serial_write(data: str, port: str = "/dev/serial0",
     Default port is /dev/serial0 (hardware UART on all RPi models).
     Use /dev/ttyUSB0 for USB-serial adapters.
     """
-    try:
-        import serial
-    except ImportError:
+    if serial is None:
         return {"success": False,
                 "error": "pyserial not installed. Run: pip install pyserial"}
     try:
-        with serial.Serial(port, baudrate=baud, timeout=1) as ser:
-            raw = data.encode(encoding)
+        raw = data.encode(encoding)   # before taking the port: a bad encoding isn't a port error
+        with _get_serial(port, baud, 1) as ser:
             ser.write(raw)
         return {"success": True, "port": port, "baud": baud,
                 "bytes_sent": len(raw), "data": data}
@@ -554,13 +1881,11 @@ def serial_read(port: str = "/dev/serial0", baud: int = 9600,
     Read up to `length` bytes from UART within `timeout_s` seconds.
     Useful for receiving raw data from GPS modules, Arduino, etc.
     """
-    try:
-        import serial
-    except ImportError:
+    if serial is None:
         return {"success": False,
                 "error": "pyserial not installed. Run: pip install pyserial"}
     try:
-        with serial.Serial(port, baudrate=baud, timeout=timeout_s) as ser:
+        with _get_serial(port, baud, timeout_s) as ser:
             raw = ser.read(length)
         text = raw.decode(encoding, errors="replace")
         return {"success": True, "port": port, "baud": baud,
@@ -575,13 +1900,11 @@ def serial_readline(port: str = "/dev/serial0", baud: int = 9600,
     Read one complete line (up to newline) from UART.
     Ideal for NMEA GPS sentences, AT command responses, sensor strings.
     """
-    try:
-        import serial
-    except ImportError:
+    if serial is None:
         return {"success": False,
                 "error": "pyserial not installed. Run: pip install pyserial"}
     try:
-        with serial.Serial(port, baudrate=baud, timeout=timeout_s) as ser:
+        with _get_serial(port, baud, timeout_s) as ser:
             raw = ser.readline()
         text = raw.decode(encoding, errors="replace").rstrip("\r\n")
         if not text:
@@ -598,9 +1921,12 @@ def rename(identifier: str | int, new_name: str, config: dict | None = None) ->
     Give a pin a new name (or rename an existing device).
     The old name is removed; the new name points to the same pin and keeps all settings.
     identifier can be a current name OR a BCM pin number.
+    A config passed in is edited in place and not saved — the caller saves
+    it (load_config() returns a copy that is safe to pass).
     """
     save = config is None
-    config = config or load_config()
+    if save:
+        config = load_config()
     devices = config.setdefault("devices", {})
 
     try:
@@ -617,15 +1943,15 @@ def rename(identifier: str | int, new_name: str, config: dict | None = None) ->
     if old_name in devices:
         del devices[old_name]
     else:
-        # Was referenced by number — remove whichever entry has this pin
-        for k, v in list(devices.items()):
-            if v["pin"] == pin:
-                del devices[k]
-                break
+        # Was referenced by number — remove the entry registered on this pin
+        hit = _pin_index(devices).get(pin)
+        if hit:
+            del devices[hit[0]]
 
     # Write under new name
     updated = {**old_device, "pin": pin}
     devices[new_name] = updated
+    _reindex(devices)
 
     if save:
         _save_config(config)
@@ -637,19 +1963,56 @@ def rename(identifier: str | int, new_name: str, config: dict | None = None) ->
 def register(name: str, pin: int, device_type: str = "output",
              description: str = "", **kwargs) -> dict:
     """Register a pin with a name and type. Overwrites if name already exists."""
-    valid_types = ("output", "relay", "input", "sensor", "pwm", "servo")
-    if device_type not in valid_types:
+    if device_type not in _DEVICE_TYPE_SET:
+        return dict(_BAD_TYPE_ERROR)
+    if unknown := kwargs.keys() - _DEVICE_OPTIONS:
         return {"success": False,
-                "error": f"type must be one of: {', '.join(valid_types)}"}
+                "error": f"unknown option(s): {', '.join(sorted(unknown))}. "
+                         f"Valid: {', '.join(sorted(_DEVICE_OPTIONS))}"}
     config = load_config()
-    config.setdefault("devices", {})[name] = {
+    devices = config.setdefault("devices", {})
+    devices[name] = {
         "pin": pin, "type": device_type, "description": description, **kwargs,
     }
+    _reindex(devices)
     _save_config(config)
     return {"success": True, "registered": name, "pin": pin,
             "type": device_type, "description": description}
 
 
+def bulk_register(devices: list[dict]) -> dict:
+    """
+    Register several pins at once, writing pin_config.json a single time.
+    Each entry takes the same fields as the register command:
+    name, pin, and optionally type, description and extra options.
+    """
+    registered, errors = [], []
+    with _defer_save():
+        for i, entry in enumerate(devices):
+            r = _register_entry(entry)
+            if r["success"]:
+                registered.append(r["registered"])
+            else:
+                errors.append({"index": i, "entry": entry, "error": r["error"]})
+    return {"success": not errors, "registered": registered, "errors": errors}
+
+
+def _register_entry(entry) -> dict:
+    """Validate one bulk_register entry and register it; an error result if it's malformed."""
+    if not isinstance(entry, dict):
+        return {"success": False, "error": "each device must be an object with name, pin"}
+    entry = dict(entry)
+    name, pin = entry.pop("name", None), entry.pop("pin", None)
+    if not name or pin is None:
+        return {"success": False, "error": "each device requires: name, pin"}
+    try:
+        pin = int(pin)
+    except (TypeError, ValueError):
+        return {"success": False, "error": f"pin must be a BCM pin number, got {pin!r}"}
+    return register(name, pin, entry.pop("type", "output"),
+                    entry.pop("description", ""), **entry)
+
+
 def unregister(identifier: str | int) -> dict:
     """Remove a pin's registration — accepts name or BCM pin number."""
     config = load_config()
@@ -658,26 +2021,29 @@ def unregister(identifier: str | int) -> dict:
     # By name
     if str(identifier) in devices:
         del devices[str(identifier)]
+        _reindex(devices)
         _save_config(config)
         return {"success": True, "unregistered": str(identifier)}
 
     # By pin number
     try:
         pin = int(identifier)
-        for name, d in list(devices.items()):
-            if d["pin"] == pin:
-                del devices[name]
-                _save_config(config)
-                return {"success": True, "unregistered": name, "pin": pin}
     except (ValueError, TypeError):
-        pass
+        pin = None
+    hit = _pin_index(devices).get(pin) if pin is not None else None
+    if hit:
+        del devices[hit[0]]
+        _reindex(devices)
+        _save_config(config)
+        return {"success": True, "unregistered": hit[0], "pin": pin}
 
     return {"success": False, "error": f"'{identifier}' not found in config."}
 
 
 def list_devices(config: dict | None = None) -> dict:
     """List all registered devices."""
-    config = config or load_config()
+    if config is None:
+        config = _shared_config()
     return {
         "success": True,
         "devices": [
@@ -692,8 +2058,15 @@ def list_devices(config: dict | None = None) -> dict:
 # Sequence / routine engine
 # ---------------------------------------------------------------------------
 
+_TEMPLATE_RE = re.compile(r"\{([^}]+)\}")
+
+
 def _resolve_template(text: str, context: dict) -> str:
     """Replace {step_name.field} or {step_name} references with values from context."""
+    s = str(text)
+    if "{" not in s:
+        return s
+
     def replacer(m):
         ref = m.group(1)
         parts = ref.split(".", 1)
@@ -704,36 +2077,48 @@ def _resolve_template(text: str, context: dict) -> str:
         else:
             val = context.get(parts[0], m.group(0))
         return str(val)
-    return re.sub(r"\{([^}]+)\}", replacer, str(text))
+    return _TEMPLATE_RE.sub(replacer, s)
+
+
+_COND_RE = re.compile(r"^\s*(.*?)\s*(>=|<=|!=|==|>|<)\s*(.*?)\s*$")
+_COND_OPS = {">=": operator.ge, "<=": operator.le, "!=": operator.ne,
+             "==": operator.eq, ">": operator.gt, "<": operator.lt}
+_TEXT_OPS = frozenset(("==", "!="))   # the operators that also compare text
 
 
-def _eval_condition(condition: str, context: dict) -> bool:
+def _split_condition(condition: str) -> list[str]:
+    """Pre-split a condition into [left, op, right], or [text] when it has no operator."""
+    m = _COND_RE.match(str(condition))
+    return list(m.groups()) if m else [str(condition)]
+
+
+def _eval_split_condition(parts: list[str], context: dict) -> bool:
     """
-    Evaluate a simple comparison: '{ref} OP value'
+    Evaluate a simple comparison, already split by _split_condition: '{ref} OP value'
     OP can be >, <, >=, <=, ==, !=
     Example: '{weather.humidity_pct} > 70'
+    Numbers compare numerically. == and != compare anything else as text;
+    the ordering operators are False unless both sides are numbers, so a
+    missing or failed reference never passes '> 70'.
     """
-    resolved = _resolve_template(condition, context)
-    for op_str, op_fn in [(">=", lambda a, b: a >= b),
-                           ("<=", lambda a, b: a <= b),
-                           ("!=", lambda a, b: str(a) != str(b)),
-                           ("==", lambda a, b: str(a) == str(b)),
-                           (">",  lambda a, b: a > b),
-                           ("<",  lambda a, b: a < b)]:
-        if op_str in resolved:
-            left, right = resolved.split(op_str, 1)
-            try:
-                return op_fn(float(left.strip()), float(right.strip()))
-            except ValueError:
-                return str(left.strip()) == str(right.strip())
-    # No operator — plain truthy check
-    return resolved.strip().lower() not in ("false", "0", "none", "", "null")
+    if len(parts) == 1:
+        # No operator — plain truthy check
+        resolved = _resolve_template(parts[0], context)
+        return resolved.strip().lower() not in ("false", "0", "none", "", "null")
+    left, op_str, right = parts
+    left = _resolve_template(left, context).strip()
+    right = _resolve_template(right, context).strip()
+    op_fn = _COND_OPS[op_str]
+    try:
+        return op_fn(float(left), float(right))
+    except ValueError:
+        return op_fn(left, right) if op_str in _TEXT_OPS else False
 
 
 def _apply_templates(obj, context: dict):
     """Recursively resolve {ref} templates in all string values of a dict/list."""
     if isinstance(obj, str):
-        return _resolve_template(obj, context)
+        return _resolve_template(obj, context) if "{" in obj else obj
     if isinstance(obj, dict):
         return {k: _apply_templates(v, context) for k, v in obj.items()}
     if isinstance(obj, list):
@@ -741,7 +2126,86 @@ def _apply_templates(obj, context: dict):
     return obj
 
 
-def sequence(steps: list[dict]) -> dict:
+def _has_template(obj) -> bool:
+    if isinstance(obj, str):
+        return "{" in obj
+    if isinstance(obj, dict):
+        return any(_has_template(v) for v in obj.values())
+    if isinstance(obj, list):
+        return any(_has_template(v) for v in obj)
+    return False
+
+
+def _step_commands(step: dict) -> list:
+    """The commands a step can run, including both branches of an if-step."""
+    if "if" in step:
+        return [c for k in ("then", "else") if isinstance(step.get(k), dict)
+                for c in _step_commands(step[k])]
+    return [step.get("command")]
+
+
+def _compile_step(step: dict) -> dict:
+    """
+    Precompute what sequence() would otherwise rediscover on every run:
+    which top-level fields contain {ref} templates ("t"), the pre-split
+    condition of an if-step, and the same for then/else/parallel sub-steps.
+    Raises ValueError for a malformed parallel block.
+    """
+    if "if" in step:
+        return {"t": [], "if": _split_condition(step["if"]),
+                "then": _compile_step(step["then"]) if step.get("then") is not None else None,
+                "else": _compile_step(step["else"]) if step.get("else") is not None else None}
+    plan = {"t": [k for k, v in step.items() if k != "parallel" and _has_template(v)]}
+    if "parallel" in step:
+        branch = step["parallel"]
+        if not isinstance(branch, list) or not all(isinstance(b, dict) for b in branch):
+            raise ValueError("'parallel' must be a list of command objects")
+        # Each writer copies, edits and saves the config; run side by side, the last one wins
+        if writers := [c for b in branch for c in _step_commands(b) if c in _CONFIG_WRITERS]:
+            raise ValueError(f"'{writers[0]}' changes pin_config.json and can't run "
+                             f"inside 'parallel'; put it in its own step")
+        plan["parallel"] = [_compile_step(b) for b in branch]
+    return plan
+
+
+def _compile_steps(steps: list[dict]) -> dict:
+    """Compile every step; raises ValueError naming the first malformed one."""
+    plans = []
+    for i, step in enumerate(steps):
+        try:
+            plans.append(_compile_step(step))
+        except ValueError as e:
+            raise ValueError(f"Step {i}: {e}") from None
+    return {"steps": plans}
+
+
+def _apply_plan(step: dict, plan: dict, context: dict) -> dict:
+    """Resolve templates only in the fields the plan marked as templated."""
+    if not plan["t"]:
+        return step
+    return {k: (_apply_templates(v, context) if k in plan["t"] else v) for k, v in step.items()}
+
+
+def _run_step(step: dict, config: dict) -> dict:
+    """Run one sequence step straight from the command table, with the sequence's config."""
+    cmd = step.get("command", "")
+    handler = _COMMANDS.get(cmd)
+    if handler is None:
+        return _unknown_command(cmd)
+    return handler(step, config)
+
+
+def _gather_steps(steps: list[dict], config: dict) -> list[dict]:
+    """
+    Run blocking commands on worker threads so they overlap; results in step order.
+    Threads rather than an event loop, so sequence() also works from async callers.
+    """
+    with ThreadPoolExecutor(max_workers=len(steps) or 1,
+                            thread_name_prefix="gpio-skill-parallel") as pool:
+        return list(pool.map(_run_step, steps, [config] * len(steps)))
+
+
+def sequence(steps: list[dict], compiled: dict | None = None) -> dict:
     """
     Run a list of commands in order.
 
@@ -757,18 +2221,61 @@ def sequence(steps: list[dict]) -> dict:
         "then": { <command payload> },
         "else": { <command payload> }   ← optional
       }
+
+    Parallel block — run independent commands at the same time, e.g. blink an
+    LED while waiting for a sensor; it takes as long as its slowest step:
+      {
+        "parallel": [ { <command payload> }, { <command payload> } ],
+        "as": "name"    ← optional, stores {"success": ..., "results": [...]}
+      }
+    Each step inside may have its own "as"; all steps in the block see the
+    results from before the block, not each other's. Commands that change
+    pin_config.json (register, rename, save_routine, ...) can't be in one.
+
+    compiled is the output of _compile_steps(steps), e.g. cached for a routine.
+    """
+    if compiled is None:
+        try:
+            compiled = _compile_steps(steps)
+        except ValueError as e:
+            return {"success": False, "error": str(e)}
+    with _sequence_ctx() as config:
+        return _run_compiled(steps, compiled, config)
+
+
+# Commands that change pin_config.json; the shared config is reloaded after them
+_CONFIG_WRITERS = frozenset(("rename", "register", "bulk_register", "unregister",
+                             "save_routine", "delete_routine"))
+
+
+@contextmanager
+def _sequence_ctx():
+    """
+    Set up once for a whole sequence: pick the GPIO backend and open its
+    process-wide handle (lgpio chip or /dev/gpiomem mapping) before the
+    first step, load the config shared by every step, and hold config
+    saves until the end. Handles stay open afterwards, closed at exit, so
+    pins keep their state between sequences.
     """
+    with _defer_save():
+        if _get_chip() is None and _get_gpiomem() is None:
+            _pinctrl_available()
+        yield _shared_config()
+
+
+def _run_compiled(steps: list[dict], compiled: dict, config: dict) -> dict:
     context: dict = {}
     results = []
 
-    for i, raw_step in enumerate(steps):
+    for i, (raw_step, plan) in enumerate(zip(steps, compiled["steps"])):
         raw_step = dict(raw_step)
 
         # --- if/then/else block ---
-        if "if" in raw_step:
-            condition_met = _eval_condition(raw_step["if"], context)
+        if "if" in plan:
+            condition_met = _eval_split_condition(plan["if"], context)
             branch_key = "then" if condition_met else "else"
             branch = raw_step.get(branch_key)
+            plan = plan[branch_key]
             results.append({
                 "_step": i, "_type": "condition",
                 "condition": raw_step["if"],
@@ -779,13 +2286,33 @@ def sequence(steps: list[dict]) -> dict:
                 continue
             raw_step = dict(branch)
 
-        # --- resolve templates in this step ---
-        step = _apply_templates(raw_step, context)
         step_name = raw_step.get("as", f"step_{i}")
 
-        result = dispatch(step)
-        context[step_name] = result
-        results.append({**result, "_step": i, "_name": step_name})
+        # --- parallel block ---
+        if "parallel" in raw_step:
+            branch = [dict(b) for b in raw_step["parallel"]]
+            outcomes = _gather_steps(
+                [_apply_plan(b, bp, context) for b, bp in zip(branch, plan["parallel"])], config)
+            sub_results = []
+            for j, (b, r) in enumerate(zip(branch, outcomes)):
+                sub_name = b.get("as", f"{step_name}_{j}")
+                context[sub_name] = r
+                sub_results.append({**r, "_name": sub_name})
+            failed = [r for b, r in zip(branch, sub_results)
+                      if not r.get("success") and b.get("on_error") != "continue"]
+            result = {"success": not failed, "results": sub_results}
+            if failed:
+                result["error"] = f"'{failed[0]['_name']}': {failed[0].get('error')}"
+            context[step_name] = result
+            results.append({**result, "_step": i, "_name": step_name, "_type": "parallel"})
+        else:
+            # --- resolve templates in this step ---
+            step = _apply_plan(raw_step, plan, context)
+            result = _run_step(step, config)
+            if step.get("command") in _CONFIG_WRITERS:
+                config = _shared_config()
+            context[step_name] = result
+            results.append({**result, "_step": i, "_name": step_name})
 
         if not result.get("success") and raw_step.get("on_error") != "continue":
             return {
@@ -800,25 +2327,47 @@ def sequence(steps: list[dict]) -> dict:
 
 def save_routine(name: str, steps: list[dict], description: str = "") -> dict:
     """Save a sequence of steps as a named routine in pin_config.json."""
+    try:
+        _compile_steps(steps)
+    except ValueError as e:
+        return {"success": False, "error": str(e)}
     config = load_config()
-    config.setdefault("routines", {})[name] = {
+    routines = config.setdefault("routines", {})
+    routines[name] = {
         "description": description,
         "steps": steps,
     }
+    for routine in routines.values():
+        routine.pop("_compiled", None)   # left by older versions
     _save_config(config)
     return {"success": True, "saved_routine": name, "steps": len(steps)}
 
 
+# routine name -> (its steps list, _compile_steps plan). Checked by identity:
+# _shared_config() hands out a new steps list whenever pin_config.json changes.
+_ROUTINE_PLANS: dict[str, tuple[list, dict]] = {}
+
+
 def run_routine(name: str) -> dict:
     """Run a previously saved routine by name."""
-    config = load_config()
+    config = _shared_config()
     routine = config.get("routines", {}).get(name)
     if routine is None:
         saved = list(config.get("routines", {}).keys())
         return {"success": False,
                 "error": f"Routine '{name}' not found.",
                 "available_routines": saved}
-    result = sequence(routine["steps"])
+    steps = routine["steps"]
+    cached = _ROUTINE_PLANS.get(name)
+    if cached is not None and cached[0] is steps:
+        compiled = cached[1]
+    else:
+        try:
+            compiled = _compile_steps(steps)
+        except ValueError as e:
+            return {"success": False, "error": str(e), "routine": name}
+        _ROUTINE_PLANS[name] = (steps, compiled)
+    result = sequence(steps, compiled)
     result["routine"] = name
     return result
 
@@ -835,7 +2384,7 @@ def delete_routine(name: str) -> dict:
 
 def list_routines() -> dict:
     """List all saved routines."""
-    config = load_config()
+    config = _shared_config()
     routines = config.get("routines", {})
     return {
         "success": True,
@@ -851,246 +2400,464 @@ def list_routines() -> dict:
 # CLI dispatcher
 # ---------------------------------------------------------------------------
 
-def dispatch(payload: dict) -> dict:
-    cmd = payload.get("command", "")
+# One handler per command: validate the payload, then call the public API.
 
-    # Accepts "device" or "pin" as the identifier field
-    identifier = payload.get("device") or payload.get("pin")
-
-    if cmd == "activate":
-        if identifier is None:
-            return {"success": False, "error": "activate requires: device (name or pin number)"}
-        return activate(identifier)
-
-    if cmd == "deactivate":
-        if identifier is None:
-            return {"success": False, "error": "deactivate requires: device (name or pin number)"}
-        return deactivate(identifier)
-
-    if cmd == "toggle":
-        if identifier is None:
-            return {"success": False, "error": "toggle requires: device (name or pin number)"}
-        return toggle(identifier)
-
-    if cmd == "read":
-        if identifier is None:
-            return {"success": False, "error": "read requires: device (name or pin number)"}
-        return read(identifier)
-
-    if cmd == "set":
-        level = payload.get("level")
-        if identifier is None or level is None:
-            return {"success": False, "error": "set requires: device (name or pin number), level (0.0–1.0)"}
-        return set_level(identifier, float(level))
-
-    if cmd == "blink":
-        if identifier is None:
-            return {"success": False, "error": "blink requires: device"}
-        return blink(
-            identifier,
-            times=int(payload.get("times", 3)),
-            on_ms=int(payload.get("on_ms", 500)),
-            off_ms=int(payload.get("off_ms", 500)),
-        )
+# Payload keys that are register's own arguments or belong to dispatch / sequence
+_REGISTER_SKIP = frozenset(("command", "name", "pin", "type", "description",
+                            "as", "on_error", "fire_and_forget"))
 
-    if cmd == "pulse":
-        if identifier is None:
-            return {"success": False, "error": "pulse requires: device"}
-        return pulse(identifier, duration_ms=int(payload.get("duration_ms", 1000)))
-
-    if cmd == "wait_for":
-        if identifier is None:
-            return {"success": False, "error": "wait_for requires: device"}
-        raw_state = payload.get("state", True)
-        if isinstance(raw_state, str):
-            raw_state = raw_state.lower() in ("true", "1", "high", "on")
-        return wait_for(
-            identifier,
-            state=bool(raw_state),
-            timeout_s=float(payload.get("timeout_s", 30)),
-            poll_ms=int(payload.get("poll_ms", 100)),
-        )
 
-    if cmd == "set_angle":
-        angle = payload.get("angle")
-        if identifier is None or angle is None:
-            return {"success": False, "error": "set_angle requires: device, angle (0–180)"}
-        return set_angle(identifier, float(angle))
-
-    if cmd == "set_mode":
-        mode = payload.get("mode", "")
-        if identifier is None or not mode:
-            return {"success": False, "error": "set_mode requires: device, mode ('input' or 'output')"}
-        return set_mode(identifier, mode)
-
-    if cmd == "read_all":
-        return read_all()
-
-    if cmd == "dht_read":
-        if identifier is None:
-            return {"success": False, "error": "dht_read requires: device (name or pin number)"}
-        return dht_read(identifier, sensor_type=payload.get("sensor_type", "DHT22"))
-
-    if cmd == "lcd_print":
-        text = payload.get("text")
-        if text is None:
-            return {"success": False, "error": "lcd_print requires: text"}
-        return lcd_print(
-            text=str(text),
-            line=int(payload.get("line", 1)),
-            cols=int(payload.get("cols", 16)),
-            rows=int(payload.get("rows", 2)),
-            mode=payload.get("mode", "i2c"),
-            i2c_address=int(payload.get("i2c_address", 0x27)),
-            rs_pin=payload.get("rs_pin"),
-            e_pin=payload.get("e_pin"),
-            data_pins=payload.get("data_pins"),
-        )
+def _identifier(payload: dict):
+    """The device a payload targets: "device", or "pin" as an alias."""
+    return payload.get("device") or payload.get("pin")
 
-    if cmd == "lcd_clear":
-        return lcd_clear(
-            cols=int(payload.get("cols", 16)),
-            rows=int(payload.get("rows", 2)),
-            mode=payload.get("mode", "i2c"),
-            i2c_address=int(payload.get("i2c_address", 0x27)),
-            rs_pin=payload.get("rs_pin"),
-            e_pin=payload.get("e_pin"),
-            data_pins=payload.get("data_pins"),
-        )
 
-    if cmd == "serial_write":
-        data = payload.get("data")
-        if data is None:
-            return {"success": False, "error": "serial_write requires: data"}
-        return serial_write(
-            data=str(data),
-            port=payload.get("port", "/dev/serial0"),
-            baud=int(payload.get("baud", 9600)),
-            encoding=payload.get("encoding", "utf-8"),
-        )
+def _identifier_command(name: str, fn):
+    """Handler for commands whose only argument is the device (name or pin number)."""
+    def handler(payload: dict, config: dict | None = None) -> dict:
+        if (identifier := _identifier(payload)) is None:
+            return {"success": False, "error": f"{name} requires: device (name or pin number)"}
+        return fn(identifier, config=config)
+    return handler
 
-    if cmd == "serial_read":
-        return serial_read(
-            port=payload.get("port", "/dev/serial0"),
-            baud=int(payload.get("baud", 9600)),
-            length=int(payload.get("length", 256)),
-            timeout_s=float(payload.get("timeout_s", 2.0)),
-            encoding=payload.get("encoding", "utf-8"),
-        )
 
-    if cmd == "serial_readline":
-        return serial_readline(
-            port=payload.get("port", "/dev/serial0"),
-            baud=int(payload.get("baud", 9600)),
-            timeout_s=float(payload.get("timeout_s", 5.0)),
-            encoding=payload.get("encoding", "utf-8"),
-        )
+_cmd_activate = _identifier_command("activate", activate)
+_cmd_deactivate = _identifier_command("deactivate", deactivate)
+_cmd_toggle = _identifier_command("toggle", toggle)
+_cmd_read = _identifier_command("read", read)
+
+
+def _cmd_set(payload: dict, config: dict | None = None) -> dict:
+    identifier = _identifier(payload)
+    level = payload.get("level")
+    if identifier is None or level is None:
+        return {"success": False, "error": "set requires: device (name or pin number), level (0.0–1.0)"}
+    return set_level(identifier, float(level), config=config)
+
+
+_cmd_stop_pwm = _identifier_command("stop_pwm", stop_pwm)
+
+
+def _cmd_blink(payload: dict, config: dict | None = None) -> dict:
+    if (identifier := _identifier(payload)) is None:
+        return {"success": False, "error": "blink requires: device"}
+    return blink(
+        identifier,
+        times=int(payload.get("times", 3)),
+        on_ms=int(payload.get("on_ms", 500)),
+        off_ms=int(payload.get("off_ms", 500)),
+        config=config,
+    )
+
+
+def _cmd_pulse(payload: dict, config: dict | None = None) -> dict:
+    if (identifier := _identifier(payload)) is None:
+        return {"success": False, "error": "pulse requires: device"}
+    return pulse(identifier, duration_ms=int(payload.get("duration_ms", 1000)), config=config)
+
+
+def _cmd_wait_for(payload: dict, config: dict | None = None) -> dict:
+    if (identifier := _identifier(payload)) is None:
+        return {"success": False, "error": "wait_for requires: device"}
+    raw_state = payload.get("state", True)
+    if isinstance(raw_state, str):
+        raw_state = raw_state.lower() in ("true", "1", "high", "on")
+    return wait_for(
+        identifier,
+        state=bool(raw_state),
+        timeout_s=float(payload.get("timeout_s", 30)),
+        poll_ms=int(payload.get("poll_ms", 100)),
+        config=config,
+    )
+
+
+def _cmd_watch(payload: dict, config: dict | None = None) -> dict:
+    if (identifier := _identifier(payload)) is None:
+        return {"success": False, "error": "watch requires: device"}
+    return watch(
+        identifier,
+        duration_s=float(payload.get("duration_s", 10)),
+        max_events=int(payload.get("max_events", 0)),
+        poll_ms=int(payload.get("poll_ms", 10)),
+        config=config,
+    )
+
+
+def _cmd_set_angle(payload: dict, config: dict | None = None) -> dict:
+    identifier = _identifier(payload)
+    angle = payload.get("angle")
+    if identifier is None or angle is None:
+        return {"success": False, "error": "set_angle requires: device, angle (0–180)"}
+    return set_angle(identifier, float(angle), config=config)
+
 
-    if cmd == "rename":
-        old = payload.get("device") or payload.get("pin") or payload.get("old")
-        new = payload.get("new_name") or payload.get("name")
-        if not old or not new:
+def _cmd_set_mode(payload: dict, config: dict | None = None) -> dict:
+    identifier = _identifier(payload)
+    mode = payload.get("mode", "")
+    if identifier is None or not mode:
+        return {"success": False, "error": "set_mode requires: device, mode ('input' or 'output')"}
+    return set_mode(identifier, mode, config=config)
+
+
+def _many_command(name: str, fn):
+    """Handler for commands that take a list of devices (names or pin numbers)."""
+    def handler(payload: dict, config: dict | None = None) -> dict:
+        devices = payload.get("devices")
+        if not isinstance(devices, list) or not devices:
             return {"success": False,
-                    "error": "rename requires: device (current name or pin number), new_name"}
-        return rename(old, new)
-
-    if cmd == "register":
-        name = payload.get("name")
-        pin = payload.get("pin")
-        dtype = payload.get("type", "output")
-        if not name or pin is None:
-            return {"success": False, "error": "register requires: name, pin. Optional: type, description"}
-        extras = {k: v for k, v in payload.items()
-                  if k not in ("command", "name", "pin", "type", "description")}
-        return register(name, int(pin), dtype, payload.get("description", ""), **extras)
-
-    if cmd == "unregister":
-        target = payload.get("name") or payload.get("device") or payload.get("pin")
-        if not target:
-            return {"success": False, "error": "unregister requires: name or pin"}
-        return unregister(target)
-
-    if cmd == "list_devices":
-        return list_devices()
-
-    if cmd == "sequence":
-        steps = payload.get("steps")
-        if not isinstance(steps, list) or len(steps) == 0:
-            return {"success": False, "error": "sequence requires: steps (non-empty list of command payloads)"}
-        return sequence(steps)
-
-    if cmd == "save_routine":
-        name = payload.get("name")
-        steps = payload.get("steps")
-        if not name or not isinstance(steps, list):
-            return {"success": False, "error": "save_routine requires: name, steps"}
-        return save_routine(name, steps, payload.get("description", ""))
-
-    if cmd == "run_routine":
-        name = payload.get("name")
-        if not name:
-            return {"success": False, "error": "run_routine requires: name"}
-        return run_routine(name)
-
-    if cmd == "delete_routine":
-        name = payload.get("name")
-        if not name:
-            return {"success": False, "error": "delete_routine requires: name"}
-        return delete_routine(name)
-
-    if cmd == "list_routines":
-        return list_routines()
-
-    if cmd == "list_backends":
-        return {
-            "success": True,
-            "pinctrl_available": _pinctrl_available(),
-            "gpiozero_available": True,
-            "recommended_backend": "pinctrl" if _pinctrl_available() else "gpiozero",
-        }
+                    "error": f"{name} requires: devices (list of names or pin numbers)"}
+        return fn(devices, config=config)
+    return handler
+
+
+_cmd_activate_many = _many_command("activate_many", activate_many)
+_cmd_deactivate_many = _many_command("deactivate_many", deactivate_many)
+
+
+def _cmd_read_all(payload: dict, config: dict | None = None) -> dict:
+    return read_all(config=config)
+
+
+def _cmd_dht_read(payload: dict, config: dict | None = None) -> dict:
+    if (identifier := _identifier(payload)) is None:
+        return {"success": False, "error": "dht_read requires: device (name or pin number)"}
+    return dht_read(identifier, sensor_type=payload.get("sensor_type", "DHT22"), config=config)
 
+
+def _cmd_lcd_print(payload: dict, config: dict | None = None) -> dict:
+    text = payload.get("text")
+    if text is None:
+        return {"success": False, "error": "lcd_print requires: text"}
+    return lcd_print(
+        text=str(text),
+        line=int(payload.get("line", 1)),
+        cols=int(payload.get("cols", 16)),
+        rows=int(payload.get("rows", 2)),
+        mode=payload.get("mode", "i2c"),
+        i2c_address=int(payload.get("i2c_address", 0x27)),
+        rs_pin=payload.get("rs_pin"),
+        e_pin=payload.get("e_pin"),
+        data_pins=payload.get("data_pins"),
+    )
+
+
+def _cmd_lcd_clear(payload: dict, config: dict | None = None) -> dict:
+    return lcd_clear(
+        cols=int(payload.get("cols", 16)),
+        rows=int(payload.get("rows", 2)),
+        mode=payload.get("mode", "i2c"),
+        i2c_address=int(payload.get("i2c_address", 0x27)),
+        rs_pin=payload.get("rs_pin"),
+        e_pin=payload.get("e_pin"),
+        data_pins=payload.get("data_pins"),
+    )
+
+
+def _cmd_lcd_close(payload: dict, config: dict | None = None) -> dict:
+    return lcd_close()
+
+
+def _cmd_serial_write(payload: dict, config: dict | None = None) -> dict:
+    data = payload.get("data")
+    if data is None:
+        return {"success": False, "error": "serial_write requires: data"}
+    return serial_write(
+        data=str(data),
+        port=payload.get("port", "/dev/serial0"),
+        baud=int(payload.get("baud", 9600)),
+        encoding=payload.get("encoding", "utf-8"),
+    )
+
+
+def _cmd_serial_read(payload: dict, config: dict | None = None) -> dict:
+    return serial_read(
+        port=payload.get("port", "/dev/serial0"),
+        baud=int(payload.get("baud", 9600)),
+        length=int(payload.get("length", 256)),
+        timeout_s=float(payload.get("timeout_s", 2.0)),
+        encoding=payload.get("encoding", "utf-8"),
+    )
+
+
+def _cmd_serial_readline(payload: dict, config: dict | None = None) -> dict:
+    return serial_readline(
+        port=payload.get("port", "/dev/serial0"),
+        baud=int(payload.get("baud", 9600)),
+        timeout_s=float(payload.get("timeout_s", 5.0)),
+        encoding=payload.get("encoding", "utf-8"),
+    )
+
+
+def _cmd_rename(payload: dict, config: dict | None = None) -> dict:
+    old = _identifier(payload) or payload.get("old")
+    new = payload.get("new_name") or payload.get("name")
+    if not old or not new:
+        return {"success": False,
+                "error": "rename requires: device (current name or pin number), new_name"}
+    return rename(old, new)
+
+
+def _cmd_register(payload: dict, config: dict | None = None) -> dict:
+    name = payload.get("name")
+    pin = payload.get("pin")
+    dtype = payload.get("type", "output")
+    if not name or pin is None:
+        return {"success": False, "error": "register requires: name, pin. Optional: type, description"}
+    extras = {k: v for k, v in payload.items() if k not in _REGISTER_SKIP}
+    return register(name, int(pin), dtype, payload.get("description", ""), **extras)
+
+
+def _cmd_bulk_register(payload: dict, config: dict | None = None) -> dict:
+    devices = payload.get("devices")
+    if not isinstance(devices, list) or not devices:
+        return {"success": False,
+                "error": "bulk_register requires: devices (list of register payloads)"}
+    return bulk_register(devices)
+
+
+def _cmd_unregister(payload: dict, config: dict | None = None) -> dict:
+    target = payload.get("name") or payload.get("device") or payload.get("pin")
+    if not target:
+        return {"success": False, "error": "unregister requires: name or pin"}
+    return unregister(target)
+
+
+def _cmd_list_devices(payload: dict, config: dict | None = None) -> dict:
+    return list_devices(config=config)
+
+
+def _cmd_sequence(payload: dict, config: dict | None = None) -> dict:
+    steps = payload.get("steps")
+    if not isinstance(steps, list) or len(steps) == 0:
+        return {"success": False, "error": "sequence requires: steps (non-empty list of command payloads)"}
+    return sequence(steps)
+
+
+def _cmd_save_routine(payload: dict, config: dict | None = None) -> dict:
+    name = payload.get("name")
+    steps = payload.get("steps")
+    if not name or not isinstance(steps, list):
+        return {"success": False, "error": "save_routine requires: name, steps"}
+    return save_routine(name, steps, payload.get("description", ""))
+
+
+def _cmd_run_routine(payload: dict, config: dict | None = None) -> dict:
+    name = payload.get("name")
+    if not name:
+        return {"success": False, "error": "run_routine requires: name"}
+    return run_routine(name)
+
+
+def _cmd_delete_routine(payload: dict, config: dict | None = None) -> dict:
+    name = payload.get("name")
+    if not name:
+        return {"success": False, "error": "delete_routine requires: name"}
+    return delete_routine(name)
+
+
+def _cmd_list_routines(payload: dict, config: dict | None = None) -> dict:
+    return list_routines()
+
+
+def _cmd_list_backends(payload: dict, config: dict | None = None) -> dict:
+    lgpio_ok = _get_chip() is not None
+    gpiomem_ok = _get_gpiomem() is not None
     return {
-        "success": False,
-        "error": (
-            f"Unknown command: '{cmd}'. "
-            "Valid: activate, deactivate, toggle, read, read_all, set, "
-            "blink, pulse, wait_for, set_angle, set_mode, "
-            "dht_read, lcd_print, lcd_clear, "
-            "serial_write, serial_read, serial_readline, "
-            "sequence, save_routine, run_routine, delete_routine, list_routines, "
-            "rename, register, unregister, list_devices, list_backends"
-        ),
+        "success": True,
+        "lgpio_available": lgpio_ok,
+        "gpiomem_available": gpiomem_ok,
+        "pinctrl_available": _pinctrl_available(),
+        "gpiozero_available": _HAS_GPIOZERO,
+        "pigpio_pwm_available": _get_pigpio() is not None,
+        "recommended_backend": ("lgpio" if lgpio_ok else "gpiomem" if gpiomem_ok else
+                                "pinctrl" if _pinctrl_available() else
+                                "gpiozero" if _HAS_GPIOZERO else None),
     }
 
 
+_BACKGROUND: queue.Queue | None = None   # fire_and_forget jobs, started on first use
+_LAST_ERROR: dict | None = None          # last failed fire_and_forget command, for last_error
+
+
+def _background_worker() -> None:
+    global _LAST_ERROR
+    while True:
+        handler, payload, config = _BACKGROUND.get()
+        try:
+            result = handler(payload, config)
+        except Exception as e:
+            result = {"success": False, "error": str(e)}
+        finally:
+            _BACKGROUND.task_done()
+        if not result.get("success"):
+            _LAST_ERROR = {"command": payload.get("command"), "error": result.get("error")}
+
+
+def _enqueue(handler, payload: dict, config: dict | None) -> dict:
+    """Hand a command to the background worker and return without waiting for it."""
+    global _BACKGROUND
+    if _BACKGROUND is None:
+        with _GPIO_LOCK:
+            if _BACKGROUND is None:
+                _BACKGROUND = queue.Queue()
+                threading.Thread(target=_background_worker, daemon=True,
+                                 name="gpio-skill-background").start()
+                atexit.register(drain_background)
+    _BACKGROUND.put((handler, payload, config))
+    return {"success": True, "queued": True, "command": payload.get("command")}
+
+
+def drain_background() -> None:
+    """Wait until every queued fire_and_forget command has run."""
+    if _BACKGROUND is not None:
+        _BACKGROUND.join()
+
+
+def _cmd_last_error(payload: dict, config: dict | None = None) -> dict:
+    """Report (and forget) the last fire_and_forget command that failed."""
+    global _LAST_ERROR
+    error, _LAST_ERROR = _LAST_ERROR, None
+    return {"success": True, "last_error": error}
+
+
+_COMMANDS = {
+    "activate": _cmd_activate,
+    "deactivate": _cmd_deactivate,
+    "activate_many": _cmd_activate_many,
+    "deactivate_many": _cmd_deactivate_many,
+    "toggle": _cmd_toggle,
+    "read": _cmd_read,
+    "set": _cmd_set,
+    "stop_pwm": _cmd_stop_pwm,
+    "blink": _cmd_blink,
+    "pulse": _cmd_pulse,
+    "wait_for": _cmd_wait_for,
+    "watch": _cmd_watch,
+    "set_angle": _cmd_set_angle,
+    "set_mode": _cmd_set_mode,
+    "read_all": _cmd_read_all,
+    "dht_read": _cmd_dht_read,
+    "lcd_print": _cmd_lcd_print,
+    "lcd_clear": _cmd_lcd_clear,
+    "lcd_close": _cmd_lcd_close,
+    "serial_write": _cmd_serial_write,
+    "serial_read": _cmd_serial_read,
+    "serial_readline": _cmd_serial_readline,
+    "rename": _cmd_rename,
+    "register": _cmd_register,
+    "bulk_register": _cmd_bulk_register,
+    "unregister": _cmd_unregister,
+    "list_devices": _cmd_list_devices,
+    "sequence": _cmd_sequence,
+    "save_routine": _cmd_save_routine,
+    "run_routine": _cmd_run_routine,
+    "delete_routine": _cmd_delete_routine,
+    "list_routines": _cmd_list_routines,
+    "list_backends": _cmd_list_backends,
+    "last_error": _cmd_last_error,
+}
+
+_VALID_CMDS_MSG = "Valid: " + ", ".join(_COMMANDS)
+
+
+def _unknown_command(cmd: str) -> dict:
+    return {"success": False, "error": f"Unknown command: '{cmd}'. {_VALID_CMDS_MSG}"}
+
+
+def dispatch(payload: dict, config: dict | None = None) -> dict:
+    """
+    Run one command payload. config, when given, is used instead of loading
+    pin_config.json (by the commands that only read it).
+    With "fire_and_forget": true the command runs on a background thread and
+    this returns {"queued": true} at once; check last_error for failures.
+    Queued commands run one at a time in the order queued, but alongside
+    whatever the caller runs next.
+    """
+    cmd = payload.get("command", "")
+    handler = _COMMANDS.get(cmd)
+    if handler is None:
+        return _unknown_command(cmd)
+    if payload.get("fire_and_forget"):
+        return _enqueue(handler, payload, config)
+    return handler(payload, config)
+
+
 # ---------------------------------------------------------------------------
 # Entry point
 # ---------------------------------------------------------------------------
 
+def _emit(result: dict | list) -> None:
+    """Write one JSON result line and flush it, so a reading pipe gets it at once."""
+    sys.stdout.write(_json_dumps(result))
+    sys.stdout.write("\n")
+    sys.stdout.flush()
+
+
+def _run_cli(payloads: list) -> tuple[list[dict], list[dict]]:
+    """
+    Run CLI payloads in order. fire_and_forget ones only get a queued reply
+    here; they are returned, in order, for _run_detached to run afterwards.
+    """
+    results, later = [], []
+    for p in payloads:
+        if not isinstance(p, dict):
+            results.append({"success": False, "error": "Each payload must be a JSON object"})
+        elif p.get("fire_and_forget") and p.get("command") in _COMMANDS:
+            later.append({**p, "fire_and_forget": False})
+            results.append({"success": True, "queued": True, "command": p["command"]})
+        else:
+            results.append(dispatch(p))
+    return results, later
+
+
+def _run_detached(payloads: list[dict], exit_code: int) -> None:
+    """
+    Exit the CLI process with exit_code straight away and run payloads, one
+    after another, in a forked child cut off from the caller's stdin, stdout
+    and stderr, so a caller waiting for the process to exit isn't held up.
+    """
+    if os.fork():
+        os._exit(exit_code)   # the reply is already flushed
+    os.setsid()
+    fd = os.open(os.devnull, os.O_RDWR)
+    for std in (0, 1, 2):
+        os.dup2(fd, std)
+    os.close(fd)
+    for p in payloads:
+        dispatch(p)
+    sys.exit(0)
+
+
 def main():
+    global _ONE_SHOT
+    _ONE_SHOT = True
     parser = argparse.ArgumentParser(
         description="GPIO Skill for OpenClaw — control Raspberry Pi GPIO by name or pin number"
     )
     parser.add_argument("--json", metavar="JSON",
-                        help='JSON payload, e.g. \'{"command":"activate","device":"17"}\'')
+                        help='JSON payload, e.g. \'{"command":"activate","device":"17"}\', '
+                             'or a JSON array of payloads')
     args = parser.parse_args()
 
     raw = args.json if args.json else sys.stdin.read().strip()
 
     if not raw:
-        print(json.dumps({"success": False,
-                          "error": "No input. Use --json '...' or pipe JSON to stdin."}))
+        _emit({"success": False, "error": "No input. Use --json '...' or pipe JSON to stdin."})
         sys.exit(1)
 
     try:
-        payload = json.loads(raw)
-    except json.JSONDecodeError as e:
-        print(json.dumps({"success": False, "error": f"Invalid JSON: {e}"}))
+        payload = _json_loads(raw)
+    except json.JSONDecodeError as e:   # orjson.JSONDecodeError subclasses it
+        _emit({"success": False, "error": f"Invalid JSON: {e}"})
         sys.exit(1)
 
-    result = dispatch(payload)
-    print(json.dumps(result))
-    sys.exit(0 if result.get("success") else 1)
+    # Several payloads in one process: one JSON array of results back
+    results, later = _run_cli(payload if isinstance(payload, list) else [payload])
+    _emit(results if isinstance(payload, list) else results[0])
+    code = 0 if all(r.get("success") for r in results) else 1
+    if later:
+        _run_detached(later, code)
+    sys.exit(code)
 
 
 if __name__ == "__main__":
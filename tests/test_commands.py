@@ -0,0 +1,135 @@
+"""Command-level checks that need no GPIO hardware; run with python -m unittest discover tests."""
+
+import json
+import subprocess
+import sys
+import tempfile
+import unittest
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+import gpio_skill  # noqa: E402
+
+
+class _TempConfig(unittest.TestCase):
+    """Point gpio_skill at an empty pin_config.json in a temp directory."""
+
+    def setUp(self):
+        self._tmp = tempfile.TemporaryDirectory()
+        self._orig = gpio_skill.CONFIG_FILE
+        gpio_skill.CONFIG_FILE = Path(self._tmp.name) / "pin_config.json"
+        gpio_skill.clear_load_cache()
+
+    def tearDown(self):
+        gpio_skill.CONFIG_FILE = self._orig
+        gpio_skill.clear_load_cache()
+        self._tmp.cleanup()
+
+
+class RegisterOptionsTest(_TempConfig):
+    def test_known_options_are_stored(self):
+        r = gpio_skill.register("door", 23, "input", pull_up=True)
+        self.assertTrue(r["success"], r)
+        self.assertTrue(gpio_skill.load_config()["devices"]["door"]["pull_up"])
+
+    def test_unknown_option_is_rejected(self):
+        r = gpio_skill.register("door", 23, "input", pullup=True)
+        self.assertFalse(r["success"])
+        self.assertIn("pullup", r["error"])
+        self.assertEqual(gpio_skill.load_config()["devices"], {})
+
+    def test_unknown_payload_field_is_rejected(self):
+        r = gpio_skill.dispatch({"command": "register", "name": "fan", "pin": 18,
+                                 "type": "pwm", "frequncy": 25000})
+        self.assertFalse(r["success"])
+        self.assertIn("frequncy", r["error"])
+
+    def test_bad_type_is_rejected(self):
+        r = gpio_skill.register("x", 5, "lamp")
+        self.assertFalse(r["success"])
+        self.assertIn("type must be one of", r["error"])
+
+
+class ResolveTest(unittest.TestCase):
+    CONFIG = {"devices": {"kitchen_light": {"pin": 17, "type": "output"},
+                          "5": {"pin": 9, "type": "output"}}}
+
+    def test_name(self):
+        self.assertEqual(gpio_skill._resolve("kitchen_light", self.CONFIG)[0], 17)
+
+    def test_int_finds_registered_device(self):
+        pin, device = gpio_skill._resolve(17, self.CONFIG)
+        self.assertEqual(pin, 17)
+        self.assertIs(device, self.CONFIG["devices"]["kitchen_light"])
+
+    def test_int_is_always_a_pin_number(self):
+        # A device may be named "5"; the integer 5 still means BCM pin 5
+        self.assertEqual(gpio_skill._resolve(5, self.CONFIG), (5, {"pin": 5, "type": "output"}))
+        self.assertEqual(gpio_skill._resolve("5", self.CONFIG)[0], 9)
+
+    def test_numeric_string_for_unregistered_pin(self):
+        self.assertEqual(gpio_skill._resolve("22", self.CONFIG), (22, {"pin": 22, "type": "output"}))
+
+    def test_unknown_name(self):
+        with self.assertRaises(ValueError):
+            gpio_skill._resolve("oven", self.CONFIG)
+
+
+class ParallelBlockTest(_TempConfig):
+    def test_parallel_must_be_a_list(self):
+        r = gpio_skill.sequence([{"parallel": "oops"}])
+        self.assertFalse(r["success"])
+        self.assertIn("Step 0", r["error"])
+
+    def test_parallel_entries_must_be_objects(self):
+        r = gpio_skill.sequence([{"command": "list_devices"}, {"parallel": [1, 2]}])
+        self.assertFalse(r["success"])
+        self.assertIn("Step 1", r["error"])
+
+    def test_config_writer_is_rejected(self):
+        r = gpio_skill.sequence([{"parallel": [
+            {"command": "list_devices"},
+            {"command": "register", "name": "a", "pin": 5},
+        ]}])
+        self.assertFalse(r["success"])
+        self.assertIn("register", r["error"])
+        self.assertEqual(gpio_skill.load_config()["devices"], {})
+
+    def test_results_keep_step_order(self):
+        r = gpio_skill.sequence([{"parallel": [
+            {"command": "list_devices", "as": "d"},
+            {"command": "list_routines", "as": "r"},
+        ], "as": "both"}])
+        self.assertTrue(r["success"], r)
+        self.assertEqual([s["_name"] for s in r["results"][0]["results"]], ["d", "r"])
+
+
+class CliArrayTest(unittest.TestCase):
+    def _run(self, payload):
+        p = subprocess.run([sys.executable, str(ROOT / "gpio_skill.py"), "--json", json.dumps(payload)],
+                           capture_output=True, text=True, timeout=30)
+        return p.returncode, json.loads(p.stdout)
+
+    def test_array_returns_results_in_order(self):
+        code, out = self._run([{"command": "list_devices"}, {"command": "list_routines"}])
+        self.assertEqual(code, 0)
+        self.assertEqual(len(out), 2)
+        self.assertIn("devices", out[0])
+        self.assertIn("routines", out[1])
+
+    def test_array_failure_sets_exit_code(self):
+        code, out = self._run([{"command": "list_devices"}, {"command": "bogus"}, 7])
+        self.assertEqual(code, 1)
+        self.assertEqual([r["success"] for r in out], [True, False, False])
+        self.assertIn("JSON object", out[2]["error"])
+
+    def test_single_payload_is_not_wrapped(self):
+        code, out = self._run({"command": "list_routines"})
+        self.assertEqual(code, 0)
+        self.assertIsInstance(out, dict)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,50 @@
+"""Sequence condition checks; run with python -m unittest discover tests."""
+
+import sys
+import unittest
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import gpio_skill  # noqa: E402
+
+
+def _eval(condition, context):
+    return gpio_skill._eval_split_condition(gpio_skill._split_condition(condition), context)
+
+
+class ConditionTest(unittest.TestCase):
+    def test_numeric_comparisons(self):
+        ctx = {"weather": {"humidity_pct": 72.5}}
+        self.assertTrue(_eval("{weather.humidity_pct} > 70", ctx))
+        self.assertFalse(_eval("{weather.humidity_pct} < 70", ctx))
+        self.assertTrue(_eval("{weather.humidity_pct} >= 72.5", ctx))
+        self.assertTrue(_eval("{weather.humidity_pct} == 72.50", ctx))
+        self.assertFalse(_eval("{weather.humidity_pct} != 72.5", ctx))
+
+    def test_text_equality(self):
+        ctx = {"door": {"state": "open"}}
+        self.assertTrue(_eval("{door.state} == open", ctx))
+        self.assertFalse(_eval("{door.state} == closed", ctx))
+        self.assertTrue(_eval("{door.state} != closed", ctx))
+        self.assertFalse(_eval("{door.state} != open", ctx))
+
+    def test_ordering_on_text_is_false(self):
+        ctx = {"door": {"state": "open"}}
+        self.assertFalse(_eval("{door.state} > 70", ctx))
+        self.assertFalse(_eval("{door.state} <= 70", ctx))
+
+    def test_unresolved_reference_is_false(self):
+        ctx = {"bad": {"success": False, "error": "timeout"}}
+        self.assertFalse(_eval("{missing.x} > 70", ctx))
+        self.assertFalse(_eval("{bad.humidity_pct} > 70", ctx))
+        self.assertFalse(_eval("{bad.humidity_pct} < 70", ctx))
+
+    def test_plain_truthiness(self):
+        self.assertTrue(_eval("{r.value}", {"r": {"value": True}}))
+        self.assertFalse(_eval("{r.value}", {"r": {"value": False}}))
+        self.assertFalse(_eval("{r.value}", {"r": {"value": None}}))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,63 @@
+"""Config persistence checks; run with python -m unittest discover tests."""
+
+import sys
+import tempfile
+import unittest
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import gpio_skill  # noqa: E402
+
+
+class DeferredSaveTest(unittest.TestCase):
+    def setUp(self):
+        self._tmp = tempfile.TemporaryDirectory()
+        self._orig = gpio_skill.CONFIG_FILE
+        gpio_skill.CONFIG_FILE = Path(self._tmp.name) / "pin_config.json"
+        gpio_skill.clear_load_cache()
+
+    def tearDown(self):
+        gpio_skill.CONFIG_FILE = self._orig
+        gpio_skill.clear_load_cache()
+        self._tmp.cleanup()
+
+    def _saved_names(self):
+        gpio_skill.clear_load_cache()
+        return sorted(gpio_skill.load_config()["devices"])
+
+    def test_bulk_register_without_config_file(self):
+        r = gpio_skill.bulk_register([{"name": "a", "pin": 5}, {"name": "b", "pin": 6},
+                                      {"name": "c", "pin": 7}])
+        self.assertEqual(r["registered"], ["a", "b", "c"])
+        self.assertEqual(self._saved_names(), ["a", "b", "c"])
+
+    def test_bulk_register_records_bad_entries(self):
+        r = gpio_skill.bulk_register([{"name": "a", "pin": "abc"}, "x",
+                                      {"name": "b", "pin": 6}, {"pin": 3}])
+        self.assertFalse(r["success"])
+        self.assertEqual(r["registered"], ["b"])
+        self.assertEqual([e["index"] for e in r["errors"]], [0, 1, 3])
+        self.assertEqual(r["errors"][1]["entry"], "x")
+        self.assertTrue(all(set(e) == {"index", "entry", "error"} for e in r["errors"]))
+        self.assertEqual(self._saved_names(), ["b"])
+
+    def test_load_config_returns_a_copy(self):
+        gpio_skill.register("a", 5)
+        gpio_skill.load_config()["devices"].clear()
+        self.assertEqual(sorted(gpio_skill.load_config()["devices"]), ["a"])
+        self.assertEqual(gpio_skill._resolve("a", gpio_skill._shared_config())[0], 5)
+
+    def test_sequence_registers_without_config_file(self):
+        r = gpio_skill.sequence([
+            {"command": "register", "name": "a", "pin": 5},
+            {"command": "register", "name": "b", "pin": 6},
+            {"command": "list_devices", "as": "listed"},
+        ])
+        self.assertTrue(r["success"], r)
+        self.assertEqual(sorted(d["name"] for d in r["results"][-1]["devices"]), ["a", "b"])
+        self.assertEqual(self._saved_names(), ["a", "b"])
+
+
+if __name__ == "__main__":
+    unittest.main()